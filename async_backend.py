@@ -0,0 +1,364 @@
+import asyncio
+import os
+import threading
+import time
+import bandwidth
+import checksums
+import config
+import instrument
+import retry
+from console import log
+
+# Optional dependency, only needed for --backend async; imported on first use by
+# _load() so that runs with the threads backend (and --help) do not pay for it
+aiohttp = None
+
+# Exceptions that mean the connection failed rather than the registry refusing the request
+NETWORK_ERRORS = ()
+
+# Connections opened/reused by the async backend during the run
+_stats = {"opened": 0, "reused": 0}
+
+# aiohttp session of the running AsyncExecutor
+_session = None
+
+
+def _load():
+    """
+    Imports aiohttp if it has not been imported yet.
+
+    Returns:
+        bool: True if aiohttp is installed.
+    """
+    global aiohttp, NETWORK_ERRORS
+    if aiohttp is None:
+        try:
+            import aiohttp as module
+        except ImportError:
+            return False
+        NETWORK_ERRORS = (module.ClientError, asyncio.TimeoutError)
+        aiohttp = module
+    return True
+
+
+def available():
+    """
+    Returns True if aiohttp is installed and the async backend can be used.
+    """
+    return _load()
+
+
+def _trace_config():
+    """
+    Builds an aiohttp trace config that reports connect times to the
+    instrument module and counts opened/reused connections.
+    """
+    trace = aiohttp.TraceConfig()
+
+    async def on_create_start(session, ctx, params):
+        ctx.connect_started = time.perf_counter()
+
+    async def on_create_end(session, ctx, params):
+        _stats["opened"] += 1
+        instrument.note_connect(time.perf_counter() - ctx.connect_started)
+
+    async def on_reuse(session, ctx, params):
+        _stats["reused"] += 1
+
+    trace.on_connection_create_start.append(on_create_start)
+    trace.on_connection_create_end.append(on_create_end)
+    trace.on_connection_reuseconn.append(on_reuse)
+    return trace
+
+
+class AsyncExecutor:
+    """
+    Runs transfer coroutines on a single event loop thread.
+
+    Mirrors the part of ThreadPoolExecutor that jarsync uses: submit()
+    takes a coroutine function and returns a concurrent.futures.Future, so
+    as_completed() and wait() work unchanged. At most max_concurrency
+    transfers are in flight; they share one aiohttp session and its
+    connection pool, so hundreds of small transfers cost one thread.
+
+    Args:
+        max_concurrency (int): Maximum number of concurrent transfers.
+    """
+
+    def __init__(self, max_concurrency):
+        if not _load():
+            raise RuntimeError("The async backend requires aiohttp (pip install aiohttp)")
+        self.max_concurrency = max(1, max_concurrency)
+        self._futures = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+
+    async def _open(self):
+        global _session
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            force_close=not config.HTTP_KEEP_ALIVE
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300),
+            trace_configs=[_trace_config()]
+        )
+
+    async def _close(self):
+        global _session
+        await _session.close()
+        _session = None
+
+    async def _run(self, func, args):
+        async with self._semaphore:
+            return await func(*args)
+
+    def submit(self, func, *args):
+        """
+        Schedules func(*args) on the event loop.
+
+        Args:
+            func (callable): Coroutine function performing one transfer.
+
+        Returns:
+            concurrent.futures.Future: Future for the coroutine's result.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._run(func, args), self._loop)
+        self._futures.append(future)
+        return future
+
+    def shutdown(self):
+        """
+        Waits for every submitted transfer, then closes the session and loop.
+        """
+        for future in self._futures:
+            future.exception()
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+
+async def _request(method, url, body_sent=None, **kwargs):
+    """
+    Sends a request with the shared session and reports its status,
+    time-to-first-byte and rate-limit headers.
+
+    Args:
+        body_sent (callable): For uploads, returns the time.perf_counter()
+            at which the body was fully sent (or None); TTFB is counted
+            from then rather than from the start of the request.
+
+    Returns:
+        aiohttp.ClientResponse: Response with headers received, body unread.
+    """
+    start = time.perf_counter()
+    response = await _session.request(method, url, **kwargs)
+    sent = body_sent() if body_sent is not None else None
+    instrument.note_status(response.status, time.perf_counter() - (sent or start))
+    retry.observe(response.status, response.headers)
+    return response
+
+
+async def put_jar(url, headers, full_path):
+    """
+    Coroutine counterpart of jarsync.put_jar().
+
+    The file is read in config.TRANSFER_CHUNK_SIZE blocks off the event loop,
+    hashed, paced by the shared bandwidth limiter and streamed to the
+    registry. Connection errors restart the
+    upload (up to config.TRANSFER_RETRIES times).
+
+    Returns:
+        tuple: (status, digests) with the HTTP status of the final attempt
+        and the hex digests of the bytes sent.
+    """
+    size = os.path.getsize(full_path)
+    attempts = 0
+    while True:
+        hashes = checksums.MultiHash()
+        try:
+            with open(full_path, 'rb') as jar_file:
+                sent = {}
+
+                async def body():
+                    block_size = bandwidth.chunk_size(config.TRANSFER_CHUNK_SIZE)
+                    while chunk := await asyncio.to_thread(jar_file.read, block_size):
+                        hashes.update(chunk)
+                        await bandwidth.consume_async(len(chunk))
+                        yield chunk
+                    sent["at"] = time.perf_counter()
+
+                # An explicit length keeps aiohttp from switching to chunked encoding
+                response = await _request("PUT", url, headers={**headers, "Content-Length": str(size)},
+                                          data=body(), body_sent=lambda: sent.get("at"))
+                async with response:
+                    await response.read()
+                    return (response.status, hashes.hexdigests())
+        except NETWORK_ERRORS as e:
+            attempts += 1
+            instrument.note_retry()
+            if attempts > config.TRANSFER_RETRIES:
+                raise
+            log(f"Upload of {os.path.basename(full_path)} interrupted, retrying: {e}")
+
+
+async def put_checksums(url, headers, digests):
+    """
+    Coroutine counterpart of jarsync.put_checksums().
+
+    Returns:
+        int: HTTP status of the first rejected sidecar, or None if all were accepted.
+    """
+    for algorithm in checksums.SIDECARS:
+        response = await _request("PUT", f"{url}.{algorithm}", headers=headers,
+                                  data=digests[algorithm].encode())
+        async with response:
+            await response.read()
+            if not 200 <= response.status < 300:
+                return response.status
+    return None
+
+
+async def fetch_checksum(url, headers, algorithm="sha1"):
+    """
+    Coroutine counterpart of jarsync.fetch_checksum().
+
+    Returns:
+        str: Lower-case hex digest, or None if the registry has none.
+    """
+    response = await _request("GET", f"{url}.{algorithm}", headers=headers)
+    async with response:
+        if response.status != 200:
+            return None
+        return checksums.parse_checksum(await response.text()) or None
+
+
+async def probe_published(url, headers, sha1, indexed=False):
+    """
+    Coroutine counterpart of jarsync.probe_published().
+
+    Returns:
+        str: 'missing', 'identical', 'conflict' or 'unknown'.
+    """
+    if not indexed:
+        response = await _request("HEAD", url, headers=headers, allow_redirects=True)
+        async with response:
+            if response.status == 404:
+                return "missing"
+            if response.status != 200:
+                return "unknown"
+
+    remote_sha1 = await fetch_checksum(url, headers, "sha1")
+    if remote_sha1 is None:
+        return "unknown"
+    if remote_sha1 == sha1:
+        return "identical"
+    return "conflict"
+
+
+async def stream_download(url, headers, output_jar, expected=None):
+    """
+    Coroutine counterpart of jarsync.stream_download().
+
+    Writes the body to '<output_jar>.part' (file writes run in the default
+    executor so the loop keeps serving other transfers), resumes partial
+    files with Range and If-Range requests, verifies the checksums computed
+    on the way and renames the part file into place once complete.
+
+    Returns:
+        tuple: (status, headers, digests, transferred) where digests is None
+        if the registry did not return a body.
+
+    Raises:
+        checksums.ChecksumMismatch: If the JAR does not match its checksum.
+    """
+    part_path = f"{output_jar}.part"
+    transferred = 0
+    attempts = 0
+
+    # Pick up where a previous run stopped
+    hashes, offset, validator = await asyncio.to_thread(checksums.resume_part, part_path,
+                                                        config.TRANSFER_CHUNK_SIZE)
+
+    while True:
+        request_headers = dict(headers)
+        if offset and validator:
+            request_headers["Range"] = f"bytes={offset}-"
+            request_headers["If-Range"] = validator
+
+        try:
+            response = await _request("GET", url, headers=request_headers)
+            async with response:
+                if response.status == 416 and offset:
+                    # Stale part file, start over
+                    hashes = checksums.MultiHash()
+                    offset = 0
+                    os.remove(part_path)
+                    checksums.discard_part_validator(part_path)
+                    continue
+                elif response.status == 206:
+                    mode = 'ab'
+                elif response.status == 200:
+                    # Registry ignored the range or the JAR changed, restart from the beginning
+                    hashes = checksums.MultiHash()
+                    offset = 0
+                    mode = 'wb'
+                    validator = checksums.save_part_validator(part_path, response.headers)
+                else:
+                    return (response.status, response.headers, None, transferred)
+
+                with open(part_path, mode) as wf:
+                    async for chunk in response.content.iter_chunked(
+                            bandwidth.chunk_size(config.TRANSFER_CHUNK_SIZE)):
+                        await bandwidth.consume_async(len(chunk))
+                        await asyncio.to_thread(wf.write, chunk)
+                        hashes.update(chunk)
+                        offset += len(chunk)
+                        transferred += len(chunk)
+                status, response_headers = response.status, response.headers
+            break
+
+        except NETWORK_ERRORS as e:
+            attempts += 1
+            instrument.note_retry()
+            if attempts > config.TRANSFER_RETRIES:
+                raise
+            log(f"Transfer of {os.path.basename(output_jar)} interrupted at {offset} bytes, resuming: {e}")
+
+    digests = hashes.hexdigests()
+    if config.VERIFY_DOWNLOADS:
+        if expected is None:
+            auth_headers = {name: value for name, value in headers.items() if not name.startswith("If-")}
+            expected = {"sha1": await fetch_checksum(url, auth_headers, "sha1")}
+        try:
+            checksums.verify(digests, expected, os.path.basename(output_jar))
+        except checksums.ChecksumMismatch:
+            os.remove(part_path)
+            checksums.discard_part_validator(part_path)
+            raise
+
+    os.replace(part_path, output_jar)
+    checksums.discard_part_validator(part_path)
+    return (status, response_headers, digests, transferred)
+
+
+def connection_stats():
+    """
+    Counts the connections opened and reused by the async backend.
+
+    Returns:
+        tuple: (opened, reused)
+    """
+    return (_stats["opened"], _stats["reused"])
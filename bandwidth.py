@@ -0,0 +1,153 @@
+import asyncio
+import re
+import threading
+import time
+
+# Multipliers for the --max-rate suffixes (binary, like the MB figures jarsync prints)
+RATE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+class TokenBucket:
+    """
+    Token bucket capping the combined throughput of all transfers.
+
+    Every transfer takes tokens for the bytes it moves. The bucket refills
+    at `rate` bytes/s and holds at most `burst` tokens; a transfer that takes
+    more than is available goes into debt and sleeps until the debt is paid
+    off, so chunks larger than the burst are still throttled correctly and
+    concurrent transfers share the rate.
+
+    Args:
+        rate (float): Sustained rate in bytes/s.
+        burst (float): Bucket size in bytes (default: a tenth of a second of
+            traffic, so a run never starts with a spike above the limit).
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate / 10)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount):
+        """
+        Takes tokens and returns how long the caller must wait for them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def consume(self, amount):
+        """
+        Blocks until `amount` bytes may be transferred.
+        """
+        delay = self._reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def consume_async(self, amount):
+        """
+        Coroutine counterpart of consume() that does not block the event loop.
+        """
+        delay = self._reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Bucket shared by every transfer of the run (None = unlimited)
+_bucket = None
+
+
+def configure(rate):
+    """
+    Sets the combined transfer rate limit of the run.
+
+    Args:
+        rate (int): Bytes per second, 0 or None for unlimited.
+    """
+    global _bucket
+    _bucket = TokenBucket(rate) if rate else None
+
+
+def limited():
+    """
+    Returns True if a transfer rate limit is in effect.
+    """
+    return _bucket is not None
+
+
+def chunk_size(default):
+    """
+    Returns the block size transfers should read and write in.
+
+    Under a rate limit blocks are capped at a tenth of a second of traffic
+    (at least 16 KB), so throttled transfers flow smoothly instead of in
+    second-long bursts.
+
+    Args:
+        default (int): Block size used without a limit (e.g. config.TRANSFER_CHUNK_SIZE).
+    """
+    if _bucket is None:
+        return default
+    return max(16 * 1024, min(default, int(_bucket.rate / 10)))
+
+
+def consume(amount):
+    """
+    Waits until `amount` bytes may be transferred under the shared limit.
+    """
+    if _bucket is not None:
+        _bucket.consume(amount)
+
+
+async def consume_async(amount):
+    """
+    Coroutine counterpart of consume().
+    """
+    if _bucket is not None:
+        await _bucket.consume_async(amount)
+
+
+class ThrottledReader:
+    """
+    File wrapper that paces an upload body through the shared bucket.
+
+    Args:
+        file_obj: Object with read() and len() (e.g. a checksums.HashingReader).
+    """
+
+    def __init__(self, file_obj):
+        self._file = file_obj
+
+    def __len__(self):
+        return len(self._file)
+
+    def read(self, size=-1):
+        chunk = self._file.read(chunk_size(size) if size and size > 0 else size)
+        consume(len(chunk))
+        return chunk
+
+
+def parse_rate(value):
+    """
+    Parses a transfer rate such as '500K', '10M' or '1.5MB/s'.
+
+    Plain numbers are bytes per second; K, M and G are powers of 1024.
+
+    Args:
+        value (str): Rate to parse ('0' for unlimited).
+
+    Returns:
+        int: Bytes per second.
+
+    Raises:
+        ValueError: If the rate cannot be parsed.
+    """
+    matched = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?\s*", str(value), re.IGNORECASE)
+    if not matched:
+        raise ValueError(f"Invalid transfer rate: {value}")
+    return int(float(matched.group(1)) * RATE_UNITS[matched.group(2).lower()])
@@ -0,0 +1,203 @@
+"""
+Benchmark harness for jarsync.py against a local fake GitLab Maven registry.
+
+Generates synthetic JAR trees, runs upload, upload-all, download and
+download-all for each requested worker count and reports files/s, MB/s and
+p50/p99 per-file latency.
+
+Example:
+    python benchmarks/bench_jarsync.py --files 200 --dirs 8 --jobs 1 4 16 --latency-ms 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fake_registry import FakeRegistry
+
+
+def generate_tree(root, files, dirs, min_kb, max_kb, seed=0):
+    """
+    Creates a lib tree of synthetic JARs spread over several directories.
+
+    Args:
+        root (str): Directory to create the tree in (emptied first).
+        files (int): Total number of JARs.
+        dirs (int): Number of directories (1 = everything in root).
+        min_kb (int): Minimum JAR size in KB.
+        max_kb (int): Maximum JAR size in KB.
+        seed (int): Seed for reproducible sizes.
+
+    Returns:
+        int: Total number of bytes generated.
+    """
+    rng = random.Random(seed)
+    shutil.rmtree(root, ignore_errors=True)
+    lib_dirs = [root] + [os.path.join(root, f"module{i}") for i in range(1, dirs)]
+    for lib_dir in lib_dirs:
+        os.makedirs(lib_dir, exist_ok=True)
+
+    total = 0
+    for i in range(files):
+        size = rng.randint(min_kb, max_kb) * 1024
+        path = os.path.join(lib_dirs[i % len(lib_dirs)], f"artifact{i}-1.{i}.0.jar")
+        with open(path, 'wb') as wf:
+            wf.write(os.urandom(size))
+        total += size
+    return total
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def timed(func, latencies):
+    """
+    Wraps a per-file transfer function to record its duration.
+    """
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def timed_async(func, latencies):
+    """
+    Wraps a per-file transfer coroutine function to record its duration.
+    """
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def run_scenario(jarsync, name, operation, path, jobs, total_bytes, backend="threads"):
+    """
+    Runs one jarsync operation and measures it.
+
+    Returns:
+        dict: Result row for the report.
+    """
+    latencies = []
+    originals = (jarsync.upload_jar, jarsync.download_jar,
+                 jarsync.upload_jar_async, jarsync.download_jar_async)
+    jarsync.upload_jar = timed(originals[0], latencies)
+    jarsync.download_jar = timed(originals[1], latencies)
+    jarsync.upload_jar_async = timed_async(originals[2], latencies)
+    jarsync.download_jar_async = timed_async(originals[3], latencies)
+
+    start = time.perf_counter()
+    try:
+        # jarsync reports progress with print; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            operation(path, jobs=jobs, backend=backend)
+    finally:
+        (jarsync.upload_jar, jarsync.download_jar,
+         jarsync.upload_jar_async, jarsync.download_jar_async) = originals
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    mb = total_bytes / (1024 * 1024)
+    return {
+        "scenario": name,
+        "backend": backend,
+        "jobs": jobs,
+        "files": len(latencies),
+        "seconds": round(elapsed, 4),
+        "filesPerSecond": round(len(latencies) / elapsed, 2),
+        "mbPerSecond": round(mb / elapsed, 2),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="jarsync benchmark",
+        description="Measure jarsync.py throughput against a local fake GitLab Maven registry."
+    )
+    parser.add_argument("--files", type=int, default=100, help="Number of JARs per scenario (default: 100)")
+    parser.add_argument("--dirs", type=int, default=4, help="Directories for upload-all/download-all (default: 4)")
+    parser.add_argument("--min-kb", type=int, default=16, help="Minimum JAR size in KB (default: 16)")
+    parser.add_argument("--max-kb", type=int, default=512, help="Maximum JAR size in KB (default: 512)")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, 16], help="Worker counts to compare (default: 1 4 16)")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Injected per-request latency (default: 10)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Per-connection bandwidth in MB/s, 0 for unlimited (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status (default: 0)")
+    parser.add_argument("--error-status", type=int, default=502, help="HTTP status used for injected errors (default: 502)")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors (default: none)")
+    parser.add_argument("--backend", choices=["threads", "async"], default="threads",
+                        help="jarsync transfer backend to measure (default: threads)")
+    parser.add_argument("--json", type=str, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    registry = FakeRegistry(
+        latency=args.latency_ms / 1000,
+        bandwidth=int(args.bandwidth_mbps * 1024 * 1024),
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after
+    ).start()
+
+    # jarsync reads its configuration from the environment on first use
+    os.environ["JARSYNC_GITLAB_URL"] = registry.url
+    os.environ.setdefault("PRIVATE_TOKEN", "benchmark")
+    import jarsync
+    import session
+
+    work_dir = tempfile.mkdtemp(prefix="jarsync-bench-")
+    results = []
+    try:
+        for jobs in args.jobs:
+            session.init_session(pool_size=max(jobs, 1))
+
+            single_dir = os.path.join(work_dir, "single")
+            total = generate_tree(single_dir, args.files, 1, args.min_kb, args.max_kb)
+            results.append(run_scenario(jarsync, "upload", jarsync.upload_jar_files, single_dir, jobs, total,
+                                       args.backend))
+            results.append(run_scenario(jarsync, "download", jarsync.download_jar_files, single_dir, jobs, total,
+                                       args.backend))
+
+            tree_dir = os.path.join(work_dir, "tree")
+            total = generate_tree(tree_dir, args.files, args.dirs, args.min_kb, args.max_kb)
+            results.append(run_scenario(jarsync, "upload-all", jarsync.upload_all_jar, tree_dir, jobs, total,
+                                       args.backend))
+            results.append(run_scenario(jarsync, "download-all", jarsync.download_all_jar, tree_dir, jobs, total,
+                                       args.backend))
+    finally:
+        registry.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'scenario':<14}{'jobs':>6}{'files':>7}{'seconds':>10}{'files/s':>10}{'MB/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for row in results:
+        print(f"{row['scenario']:<14}{row['jobs']:>6}{row['files']:>7}{row['seconds']:>10.3f}"
+              f"{row['filesPerSecond']:>10.2f}{row['mbPerSecond']:>9.2f}{row['p50Ms']:>9.2f}{row['p99Ms']:>9.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as wf:
+            json.dump({"registryRequests": registry.requests, "results": results}, wf, indent=4)
+        print(f"\nResults saved: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
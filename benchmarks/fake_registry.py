@@ -0,0 +1,265 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Maven package file endpoint of the GitLab API
+MAVEN_PATH = re.compile(r"^/api/v4/projects/[^/]+/packages/maven/(?P<path>.+)$")
+
+# Package listing endpoint of the GitLab API
+PACKAGES_PATH = re.compile(r"^/api/v4/projects/[^/]+/packages$")
+
+
+class _RegistryServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops SYNs when many clients connect at once
+    request_queue_size = 256
+
+
+class FakeRegistry:
+    """
+    Local stand-in for the GitLab Maven package registry.
+
+    Serves PUT/GET/HEAD on the Maven package file endpoints, including
+    '.sha1'/'.md5' checksum files, Range (and If-Range) requests and ETags, and keeps
+    uploaded files in memory. Uploaded checksum files are checked against
+    the stored JAR like GitLab does (422 on mismatch). Uploaded JARs are also listed, paginated, by
+    the project packages endpoint. Latency, per-connection bandwidth and error
+    responses can be injected to emulate a loaded server.
+
+    Args:
+        latency (float): Delay in seconds added before every response.
+        bandwidth (int): Per-connection transfer rate in bytes/s (0 = unlimited).
+        error_rate (float): Probability (0-1) of answering with error_status.
+        error_status (int): HTTP status returned for injected errors.
+        retry_after (float): Retry-After value sent with injected errors (None = omit).
+        host (str): Interface to bind.
+        port (int): Port to bind (0 = pick a free port).
+    """
+
+    def __init__(self, latency=0.0, bandwidth=0, error_rate=0.0, error_status=502,
+                 retry_after=None, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.files = {}
+        self.packages = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _RegistryServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Base URL to use as GITLAB_URL.
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+
+        Returns:
+            FakeRegistry: self, for chaining.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server and releases its socket.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _add_package(self, path, duplicate=False):
+        """
+        Records the package a JAR path belongs to, as GitLab does on upload.
+
+        Args:
+            path (str): '<group path>/<artifactId>/<version>/<file>' below the Maven endpoint.
+            duplicate (bool): Create a new package even if the version exists.
+        """
+        group_path, artifact_id, version, _ = path.rsplit("/", 3)
+        name = f"{group_path}/{artifact_id}"
+        with self._lock:
+            if not duplicate and any(package["name"] == name and package["version"] == version
+                                     for package in self.packages):
+                return
+            created = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()) + f".{len(self.packages):06d}Z"
+            self.packages.append({"id": len(self.packages) + 1, "name": name, "version": version,
+                                  "package_type": "maven", "created_at": created})
+
+    def _handler(self):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; avoid delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _package_path(self):
+                matched = MAVEN_PATH.match(self.path.split("?", 1)[0])
+                return matched.group("path") if matched else None
+
+            def _begin(self):
+                with registry._lock:
+                    registry.requests += 1
+                if registry.latency:
+                    time.sleep(registry.latency)
+                if registry.error_rate and random.random() < registry.error_rate:
+                    headers = {}
+                    if registry.retry_after is not None:
+                        headers["Retry-After"] = f"{registry.retry_after:g}"
+                    self._send_empty(registry.error_status, headers)
+                    return False
+                return True
+
+            def _send_empty(self, status, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _read_body(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = bytearray()
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return bytes(body)
+                        body += self._throttled_read(size)
+                        self.rfile.readline()
+                return self._throttled_read(int(self.headers.get("Content-Length") or 0))
+
+            def _throttled_read(self, size):
+                if not registry.bandwidth:
+                    return self.rfile.read(size)
+                body = bytearray()
+                while len(body) < size:
+                    chunk = self.rfile.read(min(64 * 1024, size - len(body)))
+                    if not chunk:
+                        break
+                    body += chunk
+                    time.sleep(len(chunk) / registry.bandwidth)
+                return bytes(body)
+
+            def _throttled_write(self, data):
+                step = 64 * 1024
+                for offset in range(0, len(data), step):
+                    chunk = data[offset:offset + step]
+                    self.wfile.write(chunk)
+                    if registry.bandwidth:
+                        time.sleep(len(chunk) / registry.bandwidth)
+
+            def _lookup(self, path):
+                # Checksum files are derived from the stored JAR
+                for suffix, algorithm in ((".sha1", "sha1"), (".md5", "md5"), (".sha256", "sha256")):
+                    if path.endswith(suffix) and path not in registry.files:
+                        data = registry.files.get(path[:-len(suffix)])
+                        if data is None:
+                            return None
+                        return hashlib.new(algorithm, data).hexdigest().encode()
+                return registry.files.get(path)
+
+            def do_PUT(self):
+                path = self._package_path()
+                body = self._read_body()
+                if not self._begin():
+                    return
+                if path is None:
+                    self._send_empty(404)
+                    return
+                for suffix, algorithm in ((".sha1", "sha1"), (".md5", "md5")):
+                    jar = registry.files.get(path[:-len(suffix)]) if path.endswith(suffix) else None
+                    if jar is not None:
+                        matches = body.decode().strip().lower() == hashlib.new(algorithm, jar).hexdigest()
+                        self._send_empty(204 if matches else 422)
+                        return
+                registry.files[path] = body
+                if path.endswith(".jar"):
+                    registry._add_package(path)
+                self._send_empty(200)
+
+            def do_HEAD(self):
+                self._serve(send_body=False)
+
+            def do_GET(self):
+                if PACKAGES_PATH.match(self.path.split("?", 1)[0]):
+                    self._list_packages()
+                    return
+                self._serve(send_body=True)
+
+            def _list_packages(self):
+                if not self._begin():
+                    return
+                query = parse_qs(urlparse(self.path).query)
+                per_page = int(query.get("per_page", ["20"])[0])
+                page = int(query.get("page", ["1"])[0])
+                with registry._lock:
+                    packages = sorted(registry.packages, key=lambda package: package["created_at"],
+                                      reverse=query.get("sort", ["asc"])[0] == "desc")
+                body = json.dumps(packages[(page - 1) * per_page:page * per_page]).encode()
+
+                self.send_response(200)
+                if page * per_page < len(packages):
+                    self.send_header("X-Next-Page", str(page + 1))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, send_body):
+                if not self._begin():
+                    return
+                path = self._package_path()
+                data = self._lookup(path) if path else None
+                if data is None:
+                    self._send_empty(404)
+                    return
+
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send_empty(304, {"ETag": etag})
+                    return
+
+                status = 200
+                body = data
+                range_header = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if if_range is not None and if_range != etag:
+                    # The JAR changed since the client's partial copy, serve it whole
+                    range_header = None
+                if range_header and range_header.startswith("bytes="):
+                    start = int(range_header[len("bytes="):].split("-")[0] or 0)
+                    if start >= len(data):
+                        self._send_empty(416, {"Content-Range": f"bytes */{len(data)}"})
+                        return
+                    status = 206
+                    body = data[start:]
+                    self.send_response(status)
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                else:
+                    self.send_response(status)
+
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self._throttled_write(body)
+
+        return Handler
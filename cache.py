@@ -0,0 +1,204 @@
+import os
+import json
+import shutil
+import threading
+import time
+import fcntl
+from jsonio import write_json_atomic
+from console import log
+
+# ioctl request number for FICLONE (copy-on-write clone on btrfs/xfs)
+FICLONE = 0x40049409
+
+INDEX_FILE = "index.json"
+
+
+def link_or_copy(source, destination):
+    """
+    Materializes a file at a new path as cheaply as possible.
+
+    Tries a copy-on-write reflink first, then a hardlink, and finally falls
+    back to a regular copy. The file is built next to the destination and
+    renamed over it, so an existing file is only replaced once the new one
+    is complete and is left alone if the source cannot be read.
+
+    Args:
+        source (str): Existing file to materialize.
+        destination (str): Path the file should appear at.
+
+    Returns:
+        str: Method used ('reflink', 'hardlink' or 'copy').
+
+    Raises:
+        OSError: If the source is gone or cannot be read.
+    """
+    tmp_path = f"{destination}.{threading.get_ident()}.tmp"
+    try:
+        method = _materialize(source, tmp_path)
+        os.replace(tmp_path, destination)
+    finally:
+        # Also left behind when the destination already was a hardlink of the source
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+    return method
+
+
+def _materialize(source, path):
+    if os.path.lexists(path):
+        os.remove(path)
+
+    try:
+        with open(source, 'rb') as src, open(path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return "reflink"
+    except OSError:
+        if os.path.exists(path):
+            os.remove(path)
+
+    try:
+        os.link(source, path)
+        return "hardlink"
+    except OSError:
+        shutil.copyfile(source, path)
+        return "copy"
+
+
+class ArtifactCache:
+    """
+    Content-addressed on-disk cache of downloaded JARs.
+
+    Artifacts are looked up by groupId/artifactId/version (and the SHA-256
+    expected by the manifest, when known) and stored once per SHA-256
+    digest under '<cache_dir>/sha256/'. When the cache grows past its
+    size cap the least recently used blobs are evicted.
+
+    Args:
+        cache_dir (str): Directory holding the cache.
+        max_bytes (int): Size cap in bytes (0 = unlimited).
+    """
+
+    def __init__(self, cache_dir, max_bytes=0):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.cache_dir, "sha256"), exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self._artifacts, self._blobs = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r') as rf:
+                index = json.load(rf)
+            return index.get("artifacts", {}), index.get("blobs", {})
+        except (OSError, json.JSONDecodeError):
+            return {}, {}
+
+    @staticmethod
+    def _key(group_id_path, artifact_id, version):
+        return f"{group_id_path}/{artifact_id}/{version}"
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.cache_dir, "sha256", sha256[:2], f"{sha256}.jar")
+
+    def fetch(self, group_id_path, artifact_id, version, destination, sha256=None):
+        """
+        Serves an artifact from the cache into a destination path.
+
+        Args:
+            group_id_path (str): Group ID path formatted with '/'.
+            artifact_id (str): Name of the artifact.
+            version (str): Version of the artifact.
+            destination (str): Path the JAR should be written to.
+            sha256 (str): Expected SHA-256 (e.g. from library.json); a cached
+                artifact with another digest, such as a version that was
+                re-published since, counts as a miss.
+
+        Returns:
+            int: Size of the served JAR, or 0 on a cache miss.
+        """
+        key = self._key(group_id_path, artifact_id, version)
+        with self._lock:
+            cached_sha256 = self._artifacts.get(key)
+            blob = self._blobs.get(cached_sha256) if cached_sha256 else None
+            if (blob is None or (sha256 and sha256.lower() != cached_sha256)
+                    or not os.path.isfile(self._blob_path(cached_sha256))):
+                self.misses += 1
+                return 0
+            blob["lastUsed"] = time.time()
+
+        try:
+            link_or_copy(self._blob_path(cached_sha256), destination)
+        except OSError:
+            # Evicted by a concurrent store() since the check above
+            with self._lock:
+                self.misses += 1
+            return 0
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_served += blob["size"]
+        return blob["size"]
+
+    def store(self, group_id_path, artifact_id, version, sha256, source):
+        """
+        Adds a freshly downloaded JAR to the cache.
+
+        Args:
+            group_id_path (str): Group ID path formatted with '/'.
+            artifact_id (str): Name of the artifact.
+            version (str): Version of the artifact.
+            sha256 (str): Hex SHA-256 digest of the JAR.
+            source (str): Path of the downloaded JAR.
+        """
+        blob_path = self._blob_path(sha256)
+        size = os.path.getsize(source)
+
+        if not os.path.isfile(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            # Always copy into the cache so later writes to the source cannot alter the blob
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, blob_path)
+
+        with self._lock:
+            self._artifacts[self._key(group_id_path, artifact_id, version)] = sha256
+            self._blobs[sha256] = {"size": size, "lastUsed": time.time()}
+            self._evict()
+
+    def _evict(self):
+        # Caller must hold the lock
+        if not self.max_bytes:
+            return
+
+        total = sum(blob["size"] for blob in self._blobs.values())
+        for sha256, blob in sorted(self._blobs.items(), key=lambda item: item[1]["lastUsed"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(sha256))
+            except OSError:
+                pass
+            total -= blob["size"]
+            del self._blobs[sha256]
+
+        self._artifacts = {key: sha256 for key, sha256 in self._artifacts.items()
+                           if sha256 in self._blobs}
+
+    def save(self):
+        """
+        Persists the cache index to disk.
+        """
+        with self._lock:
+            index = {"artifacts": self._artifacts, "blobs": self._blobs}
+            write_json_atomic(self._index_path, index, compact=True)
+
+    def print_stats(self):
+        """
+        Prints cache hit/miss statistics for the run.
+        """
+        mb = self.bytes_served / (1024 * 1024)
+        log(f"Cache hits: {self.hits}, misses: {self.misses}, served from cache: {mb:.2f} MB")
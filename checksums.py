@@ -0,0 +1,213 @@
+import hashlib
+import os
+import time
+
+# Digests computed for every transferred JAR: Maven sidecars (.sha1/.md5) and the manifest SHA-256
+ALGORITHMS = ("sha1", "sha256", "md5")
+
+# Sidecar checksum files uploaded next to each JAR, as Maven clients expect
+SIDECARS = ("sha1", "md5")
+
+
+class ChecksumMismatch(Exception):
+    """
+    Raised when a transferred JAR does not match its expected checksum.
+    """
+
+
+class MultiHash:
+    """
+    Computes several digests of a byte stream in one pass.
+
+    Args:
+        algorithms (tuple): hashlib algorithm names (default: ALGORITHMS).
+    """
+
+    def __init__(self, algorithms=ALGORITHMS):
+        self._digests = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+
+    def update(self, chunk):
+        for digest in self._digests.values():
+            digest.update(chunk)
+
+    def hexdigests(self):
+        """
+        Returns:
+            dict: Hex digest per algorithm name.
+        """
+        return {algorithm: digest.hexdigest() for algorithm, digest in self._digests.items()}
+
+
+class HashingReader:
+    """
+    File wrapper that hashes the bytes as the HTTP client reads them.
+
+    Handing this to requests instead of the file streams the upload and
+    computes its checksums without a second read of the file. The time the
+    client reached the end of the file, i.e. finished sending the body, is
+    kept in eof_at (time.perf_counter(), None until then).
+
+    Args:
+        file_obj (file): Binary file opened for reading, positioned at 0.
+        size (int): Size of the file, reported as the request Content-Length.
+    """
+
+    def __init__(self, file_obj, size):
+        self._file = file_obj
+        self._size = size
+        self.hashes = MultiHash()
+        self.eof_at = None
+
+    def __len__(self):
+        return self._size
+
+    def read(self, size=-1):
+        chunk = self._file.read(size)
+        if chunk:
+            self.hashes.update(chunk)
+        elif self.eof_at is None:
+            self.eof_at = time.perf_counter()
+        return chunk
+
+
+def file_digests(path, chunk_size=1024 * 1024, hashes=None):
+    """
+    Computes the digests of a file in a single read pass.
+
+    Args:
+        path (str): File to hash.
+        chunk_size (int): Read buffer size.
+        hashes (MultiHash): Hash to continue (e.g. for a resumed download).
+
+    Returns:
+        tuple: (hashes, size) with the updated MultiHash and the bytes read.
+    """
+    hashes = hashes or MultiHash()
+    size = 0
+    with open(path, 'rb') as rf:
+        for chunk in iter(lambda: rf.read(chunk_size), b''):
+            hashes.update(chunk)
+            size += len(chunk)
+    return (hashes, size)
+
+
+def resume_part(part_path, chunk_size=1024 * 1024):
+    """
+    Picks up the part file of an interrupted download.
+
+    A part file is only resumed if the validator of the response it was
+    written from is stored next to it (see save_part_validator). The caller
+    sends it as If-Range, so a JAR that changed since is served whole
+    instead of being appended to stale bytes.
+
+    Args:
+        part_path (str): Part file of the download.
+        chunk_size (int): Read buffer size.
+
+    Returns:
+        tuple: (hashes, offset, validator), or a new MultiHash, 0 and None if
+        there is nothing to resume.
+    """
+    validator = None
+    if os.path.isfile(part_path) and os.path.isfile(f"{part_path}.etag"):
+        with open(f"{part_path}.etag") as rf:
+            validator = rf.read().strip() or None
+    if validator is None:
+        return (MultiHash(), 0, None)
+    hashes, offset = file_digests(part_path, chunk_size)
+    return (hashes, offset, validator)
+
+
+def save_part_validator(part_path, headers):
+    """
+    Stores the validator of a download response next to its part file.
+
+    A strong ETag is used if there is one, else the Last-Modified date (weak
+    ETags are not allowed in If-Range). Without either, any stored validator
+    is removed and the part file will not be resumed.
+
+    Args:
+        part_path (str): Part file the response body is written to.
+        headers (Mapping): Response headers.
+
+    Returns:
+        str: The stored validator, or None.
+    """
+    etag = headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+    if validator:
+        with open(f"{part_path}.etag", "w") as wf:
+            wf.write(validator)
+    else:
+        discard_part_validator(part_path)
+    return validator
+
+
+def discard_part_validator(part_path):
+    """
+    Removes the validator stored for a part file, if any.
+    """
+    try:
+        os.remove(f"{part_path}.etag")
+    except FileNotFoundError:
+        pass
+
+
+def parse_checksum(text):
+    """
+    Extracts the hex digest from a checksum file ('<hex>' or '<hex>  <file>').
+
+    Returns:
+        str: Lower-case hex digest, or '' if the file is empty.
+    """
+    text = (text or "").strip()
+    return text.split()[0].lower() if text else ""
+
+
+def verify(digests, expected, name):
+    """
+    Compares computed digests with expected ones.
+
+    Args:
+        digests (dict): Hex digest per algorithm of the transferred bytes.
+        expected (dict): Expected hex digest per algorithm; missing or empty
+            values are not checked.
+        name (str): File name used in the error message.
+
+    Raises:
+        ChecksumMismatch: If any expected digest differs.
+    """
+    for algorithm, value in (expected or {}).items():
+        if value and digests.get(algorithm) != value.lower():
+            raise ChecksumMismatch(f"{name}: {algorithm} {digests.get(algorithm)} "
+                                   f"does not match expected {value.lower()}")
+
+
+def verify_file(path, size=None, sha256=None):
+    """
+    Re-hashes a JAR on disk and checks it against its manifest entry.
+
+    Runs in worker processes of the verify command, so it only depends on
+    the standard library.
+
+    Args:
+        path (str): JAR to check.
+        size (int): Expected size in bytes, if known.
+        sha256 (str): Expected hex SHA-256, if known.
+
+    Returns:
+        tuple: (path, status, detail) where status is 'ok', 'missing',
+        'mismatch' or 'unverified' (no checksum to compare with).
+    """
+    if not os.path.isfile(path):
+        return (path, "missing", "file not found")
+    if size is not None and os.path.getsize(path) != size:
+        return (path, "mismatch", f"size {os.path.getsize(path)} != {size}")
+    if not sha256:
+        return (path, "unverified", "no sha256 recorded")
+
+    hashes, _ = file_digests(path, hashes=MultiHash(("sha256",)))
+    actual = hashes.hexdigests()["sha256"]
+    if actual != sha256.lower():
+        return (path, "mismatch", f"sha256 {actual} != {sha256.lower()}")
+    return (path, "ok", "")
@@ -1,16 +1,5 @@
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from a .env file if present
-load_dotenv()
-# Read the private token from an environment variable
-PRIVATE_TOKEN = os.getenv("PRIVATE_TOKEN")
-if not PRIVATE_TOKEN:
-    raise ValueError("No private token provided from '.env'")
-
-PROJECT_ID = 121 # personal EWSclient project
-
-DEFAULT_GROUP_ID = "com.ilts.libs"
+import threading
 
 #current pyhon proj path
 PYTHON_PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
@@ -20,4 +9,111 @@ JAR_FOLDER_PATH = os.path.abspath(os.path.join(PYTHON_PROJECT_ROOT,"..","lib"))
 #SAVED_JSON = os.path.abspath(os.path.join(PYTHON_PROJECT_ROOT,"..",'library.json'))
 SAVED_JSON = "library.json"
 
-DOWNLOADED_JAR_PATH = os.path.abspath(os.path.join(PYTHON_PROJECT_ROOT,"..","lib"))
\ No newline at end of file
+DOWNLOADED_JAR_PATH = os.path.abspath(os.path.join(PYTHON_PROJECT_ROOT,"..","lib"))
+
+SYNC_STATE_JSON = ".jarsync-state.json"
+
+# Settings read from the environment (and a .env file) on first access, see load()
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def load(reload=False):
+    """
+    Reads the settings that come from the environment.
+
+    A .env file is loaded first if present. This runs on the first access
+    to one of these settings (e.g. config.GITLAB_URL), not at import time,
+    so importing jarsync or running --help does not touch .env, and code
+    embedding jarsync can adjust os.environ before the first run.
+
+    Args:
+        reload (bool): Read the environment again.
+
+    Returns:
+        dict: Setting name to value.
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is not None and not reload:
+            return _settings
+
+        from dotenv import load_dotenv
+
+        # Load environment variables from a .env file if present
+        load_dotenv()
+        _settings = {
+            # Read the private token from an environment variable (checked when it is used)
+            "PRIVATE_TOKEN": os.getenv("PRIVATE_TOKEN"),
+
+            "PROJECT_ID": int(os.getenv("JARSYNC_PROJECT_ID", "121")), # personal EWSclient project
+
+            # GitLab instance hosting the Maven package registry
+            "GITLAB_URL": os.getenv("JARSYNC_GITLAB_URL", "https://gitlab.ilts.com").rstrip("/"),
+
+            "DEFAULT_GROUP_ID": os.getenv("JARSYNC_GROUP_ID", "com.ilts.libs"),
+
+            # Number of JARs transferred in parallel (override with -j / --jobs)
+            "DEFAULT_JOBS": int(os.getenv("JARSYNC_JOBS", "1")),
+
+            # Transfer backend: 'threads' (requests in a thread pool) or 'async' (aiohttp, optional)
+            "TRANSFER_BACKEND": os.getenv("JARSYNC_BACKEND", "threads"),
+
+            # Combined transfer rate limit, e.g. '10M' bytes/s (0 = unlimited)
+            "MAX_RATE": os.getenv("JARSYNC_MAX_RATE", "0"),
+
+            # Shared HTTP session settings
+            "HTTP_POOL_SIZE": int(os.getenv("JARSYNC_POOL_SIZE", "10")),
+            "HTTP_MAX_RETRIES": int(os.getenv("JARSYNC_HTTP_RETRIES", "3")),
+            "HTTP_KEEP_ALIVE": os.getenv("JARSYNC_KEEP_ALIVE", "1") != "0",
+
+            # Local artifact cache for downloads (disabled when JARSYNC_CACHE_DIR is unset)
+            "CACHE_DIR": os.getenv("JARSYNC_CACHE_DIR"),
+            "CACHE_MAX_MB": int(os.getenv("JARSYNC_CACHE_MAX_MB", "2048")),
+
+            # Incremental downloads: skip JARs that are already up to date on disk
+            "INCREMENTAL": os.getenv("JARSYNC_INCREMENTAL", "0") == "1",
+
+            # Probe the registry before uploading and skip JARs that are already published
+            "SKIP_PUBLISHED": os.getenv("JARSYNC_SKIP_PUBLISHED", "0") == "1",
+
+            # Buffer size for streaming JARs to/from the registry and retries for dropped transfers
+            "TRANSFER_CHUNK_SIZE": int(os.getenv("JARSYNC_CHUNK_SIZE", str(1024 * 1024))),
+            "TRANSFER_RETRIES": int(os.getenv("JARSYNC_TRANSFER_RETRIES", "3")),
+
+            # Upload '.sha1'/'.md5' sidecars with each JAR and verify downloads against their checksums
+            "UPLOAD_CHECKSUMS": os.getenv("JARSYNC_UPLOAD_CHECKSUMS", "1") != "0",
+            "VERIFY_DOWNLOADS": os.getenv("JARSYNC_VERIFY", "1") != "0",
+
+            # Retries of failed transfers (429/5xx/network errors) with jittered exponential backoff
+            "RETRY_MAX_ATTEMPTS": int(os.getenv("JARSYNC_RETRY_ATTEMPTS", "5")),
+            "RETRY_BASE_DELAY": float(os.getenv("JARSYNC_RETRY_BASE_DELAY", "0.5")),
+            "RETRY_MAX_DELAY": float(os.getenv("JARSYNC_RETRY_MAX_DELAY", "60")),
+
+            # Maximum directory depth scanned by --upload-all / --download-all (None = unlimited)
+            "SCAN_MAX_DEPTH": int(os.getenv("JARSYNC_MAX_DEPTH")) if os.getenv("JARSYNC_MAX_DEPTH") else None,
+
+            # Local index of published packages used to resolve 'latest'/version ranges (refreshed after TTL seconds)
+            "REGISTRY_INDEX": os.getenv("JARSYNC_INDEX", os.path.join(PYTHON_PROJECT_ROOT, ".jarsync-index.json")),
+            "REGISTRY_INDEX_TTL": float(os.getenv("JARSYNC_INDEX_TTL", "300")),
+
+            # Optional consolidated SQLite manifest store (per-folder library.json when unset)
+            "MANIFEST_DB": os.getenv("JARSYNC_MANIFEST_DB"),
+
+            # Manifest writing: compact output and checkpoint interval (seconds) for long uploads
+            "MANIFEST_COMPACT": os.getenv("JARSYNC_COMPACT_JSON", "0") == "1",
+            "MANIFEST_FLUSH_INTERVAL": float(os.getenv("JARSYNC_MANIFEST_FLUSH_INTERVAL", "30")),
+        }
+        return _settings
+
+
+def __getattr__(name):
+    # Environment settings are resolved lazily (PEP 562 module __getattr__)
+    if name.startswith("__"):
+        raise AttributeError(name)
+    settings = load()
+    if name not in settings:
+        raise AttributeError(f"module 'config' has no attribute '{name}'")
+    if name == "PRIVATE_TOKEN" and not settings[name]:
+        raise ValueError("No private token provided from '.env'")
+    return settings[name]
@@ -0,0 +1,20 @@
+import sys
+import threading
+
+# Transfer workers report concurrently; one lock keeps each line whole
+_lock = threading.Lock()
+
+
+def log(message=""):
+    """
+    Prints a line of progress output.
+
+    Safe to call from the worker pool and the async backend's event loop:
+    the message and its newline are written in a single call under a lock,
+    so lines of concurrent transfers never run together.
+
+    Args:
+        message (str): Line to print, without the trailing newline.
+    """
+    with _lock:
+        sys.stdout.write(f"{message}\n")
@@ -0,0 +1,324 @@
+import os
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Finished transfers of the current run
+_transfers = []
+_transfers_lock = threading.Lock()
+
+# Transfer being tracked by the current worker thread or asyncio task
+_current = ContextVar("jarsync_transfer", default=None)
+
+
+class Transfer:
+    """
+    Timings and outcome of a single JAR transfer.
+
+    Args:
+        operation (str): 'upload' or 'download'.
+        jar_filename (str): File name of the JAR.
+    """
+
+    def __init__(self, operation, jar_filename):
+        self.operation = operation
+        self.jar_filename = jar_filename
+        self.started = time.time()
+        self.perf_started = time.perf_counter()
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = None
+        self.seconds = 0.0
+        self.bytes = 0
+        self.retries = 0
+        self.http_status = None
+        self.retry_after = None
+        self.retryable = False
+        self.status = None
+        self.deferred = False
+
+    def finish(self, status, size=0):
+        """
+        Records the outcome of the transfer.
+
+        Args:
+            status (str): Result such as 'uploaded', 'downloaded', 'skipped' or 'failed'.
+            size (int): Bytes moved over the network.
+        """
+        self.status = status
+        self.bytes = size
+
+    def to_dict(self):
+        """
+        Returns the transfer as a JSON-serializable dict (times in ms).
+        """
+        transfer_ms = self.seconds - (self.ttfb or 0.0)
+        return {
+            "operation": self.operation,
+            "jarFilename": self.jar_filename,
+            "status": self.status,
+            "httpStatus": self.http_status,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "startedAt": self.started,
+            "connectMs": round(self.connect * 1000, 3),
+            "tlsMs": round(self.tls * 1000, 3),
+            "ttfbMs": round(self.ttfb * 1000, 3) if self.ttfb is not None else None,
+            "transferMs": round(max(transfer_ms, 0.0) * 1000, 3),
+            "totalMs": round(self.seconds * 1000, 3)
+        }
+
+
+@contextmanager
+def track(operation, jar_filename):
+    """
+    Tracks a transfer on the current thread (or asyncio task) for the
+    duration of the block.
+
+    Connection and response timings reported through note_connect(),
+    note_response() and note_retry() while the block runs are attributed
+    to this transfer.
+
+    Args:
+        operation (str): 'upload' or 'download'.
+        jar_filename (str): File name of the JAR.
+
+    Yields:
+        Transfer: The transfer being tracked.
+    """
+    with resume(Transfer(operation, jar_filename)) as transfer:
+        yield transfer
+
+
+@contextmanager
+def resume(transfer):
+    """
+    Tracks a transfer started by track() for the duration of the block,
+    e.g. a retry the worker pool ran again after its backoff delay.
+
+    The transfer is recorded when the block ends, unless the block set
+    transfer.deferred because another attempt will follow. Its duration
+    counts from the first attempt, backoff delays included.
+
+    Args:
+        transfer (Transfer): The transfer to continue tracking.
+
+    Yields:
+        Transfer: The same transfer.
+    """
+    transfer.deferred = False
+    token = _current.set(transfer)
+    try:
+        yield transfer
+    finally:
+        transfer.seconds = time.perf_counter() - transfer.perf_started
+        _current.reset(token)
+        if not transfer.deferred:
+            with _transfers_lock:
+                _transfers.append(transfer)
+
+
+def current():
+    """
+    Returns the transfer tracked by the current thread or task, if any.
+    """
+    return _current.get()
+
+
+def note_connect(connect, tls=0.0):
+    """
+    Attributes a newly opened connection to the current transfer.
+
+    Args:
+        connect (float): Seconds spent on DNS resolution and the TCP connect.
+        tls (float): Seconds spent on the TLS handshake.
+    """
+    transfer = current()
+    if transfer is not None:
+        transfer.connect += connect
+        transfer.tls += tls
+
+
+def note_response(response, sending=None):
+    """
+    Records time-to-first-byte and status of a registry response.
+
+    requests counts its elapsed time from the start of the request, so for
+    uploads it also covers sending the body; pass that part as sending to
+    measure TTFB from the end of the upload instead.
+
+    Args:
+        response (requests.Response): Response whose headers were received.
+        sending (float): Seconds spent sending the request body, if known.
+    """
+    ttfb = response.elapsed.total_seconds()
+    if sending is not None:
+        ttfb = max(0.0, ttfb - sending)
+    note_status(response.status_code, ttfb)
+
+
+def note_status(status_code, ttfb):
+    """
+    Records time-to-first-byte and status of a response from any HTTP client.
+
+    Args:
+        status_code (int): HTTP status of the response.
+        ttfb (float): Seconds from sending the request (including its body)
+            to receiving the headers.
+    """
+    transfer = current()
+    if transfer is not None:
+        if transfer.ttfb is None:
+            transfer.ttfb = ttfb
+        transfer.http_status = status_code
+
+
+def note_network_error():
+    """
+    Marks the current transfer as failed by a transient network error.
+    """
+    transfer = current()
+    if transfer is not None:
+        transfer.retryable = True
+
+
+def note_retry():
+    """
+    Counts a retry of the current transfer.
+    """
+    transfer = current()
+    if transfer is not None:
+        transfer.retries += 1
+
+
+def transfers():
+    """
+    Returns the transfers recorded so far.
+    """
+    with _transfers_lock:
+        return list(_transfers)
+
+
+def reset():
+    """
+    Forgets all recorded transfers.
+    """
+    with _transfers_lock:
+        _transfers.clear()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summary(wall_seconds):
+    """
+    Aggregates the recorded transfers per operation.
+
+    Args:
+        wall_seconds (float): Wall-clock duration of the run.
+
+    Returns:
+        dict: Totals, status counts and latency percentiles per operation.
+    """
+    operations = {}
+    for transfer in transfers():
+        operations.setdefault(transfer.operation, []).append(transfer)
+
+    result = {"wallSeconds": round(wall_seconds, 3), "operations": {}}
+    for operation, items in operations.items():
+        statuses = {}
+        for transfer in items:
+            statuses[transfer.status] = statuses.get(transfer.status, 0) + 1
+        totals = [transfer.seconds * 1000 for transfer in items]
+        ttfbs = [transfer.ttfb * 1000 for transfer in items if transfer.ttfb is not None]
+        result["operations"][operation] = {
+            "count": len(items),
+            "statuses": statuses,
+            "bytes": sum(transfer.bytes for transfer in items),
+            "retries": sum(transfer.retries for transfer in items),
+            "connectMs": round(sum(transfer.connect for transfer in items) * 1000, 3),
+            "tlsMs": round(sum(transfer.tls for transfer in items) * 1000, 3),
+            "ttfbP50Ms": round(_percentile(ttfbs, 50), 3),
+            "totalP50Ms": round(_percentile(totals, 50), 3),
+            "totalP99Ms": round(_percentile(totals, 99), 3)
+        }
+    return result
+
+
+def write_report(path, wall_seconds):
+    """
+    Writes the run summary and every transfer to a JSON file.
+
+    A path ending in '.jsonl' gets one JSON object per transfer followed by
+    a final summary line instead.
+
+    Args:
+        path (str): Destination file.
+        wall_seconds (float): Wall-clock duration of the run.
+    """
+    run_summary = summary(wall_seconds)
+    records = [transfer.to_dict() for transfer in transfers()]
+
+    with open(path, 'w') as wf:
+        if path.endswith(".jsonl"):
+            for record in records:
+                wf.write(json.dumps(record) + "\n")
+            wf.write(json.dumps({"summary": run_summary}) + "\n")
+        else:
+            json.dump({"summary": run_summary, "transfers": records}, wf, indent=4)
+
+
+def write_prometheus(path, wall_seconds):
+    """
+    Writes run metrics in the Prometheus textfile collector format.
+
+    Args:
+        path (str): Destination .prom file.
+        wall_seconds (float): Wall-clock duration of the run.
+    """
+    run_summary = summary(wall_seconds)
+    lines = [
+        "# HELP jarsync_run_seconds Wall-clock duration of the jarsync run.",
+        "# TYPE jarsync_run_seconds gauge",
+        f"jarsync_run_seconds {run_summary['wallSeconds']}",
+        "# HELP jarsync_transfers_total JAR transfers by operation and result.",
+        "# TYPE jarsync_transfers_total counter"
+    ]
+    for operation, stats in run_summary["operations"].items():
+        for status, count in stats["statuses"].items():
+            lines.append(f'jarsync_transfers_total{{operation="{operation}",status="{status}"}} {count}')
+
+    lines += [
+        "# HELP jarsync_transfer_bytes_total Bytes moved by operation.",
+        "# TYPE jarsync_transfer_bytes_total counter"
+    ]
+    for operation, stats in run_summary["operations"].items():
+        lines.append(f'jarsync_transfer_bytes_total{{operation="{operation}"}} {stats["bytes"]}')
+
+    lines += [
+        "# HELP jarsync_transfer_retries_total Transfer retries by operation.",
+        "# TYPE jarsync_transfer_retries_total counter"
+    ]
+    for operation, stats in run_summary["operations"].items():
+        lines.append(f'jarsync_transfer_retries_total{{operation="{operation}"}} {stats["retries"]}')
+
+    lines += [
+        "# HELP jarsync_transfer_latency_ms Per-file transfer latency percentiles.",
+        "# TYPE jarsync_transfer_latency_ms gauge"
+    ]
+    for operation, stats in run_summary["operations"].items():
+        lines.append(f'jarsync_transfer_latency_ms{{operation="{operation}",quantile="0.5"}} {stats["totalP50Ms"]}')
+        lines.append(f'jarsync_transfer_latency_ms{{operation="{operation}",quantile="0.99"}} {stats["totalP99Ms"]}')
+
+    # Write next to the target and rename so the collector never reads a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as wf:
+        wf.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
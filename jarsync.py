@@ -1,399 +1,2045 @@
 import requests
 import os
 import json
+import shutil
 import re
+import hashlib
 import config
+import session
+import instrument
+import retry
+import async_backend
+import checksums
+import bandwidth
+import scheduler
+import threading
+from cache import ArtifactCache, link_or_copy
+from scanner import iter_jar_dirs, iter_manifest_dirs, list_jar_files
+from manifest_store import ManifestStore
+from registry_index import RegistryIndex, is_dynamic, sort_versions
+from jsonio import write_json_atomic
+from console import log
 import argparse
+from contextlib import contextmanager
+from functools import partial
+from fnmatch import fnmatch
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
-# initialize config variiables
-project_id = config.PROJECT_ID 
-default_group_id = config.DEFAULT_GROUP_ID
+# initialize config variiables (environment settings are resolved on first use, see config.load)
 #dowload_jar_path = config.DOWNLOADED_JAR_PATH
-PRIVATE_TOKEN = config.PRIVATE_TOKEN
 saved_json = config.SAVED_JSON
+sync_state_json = config.SYNC_STATE_JSON
 
+# Client of the running operation, and the one used outside of any client (created on first use)
+_active_client = None
+_default_client = None
+_run_lock = threading.RLock()
 
-def init_jar_request(project_id, group_id_path, artifact_id, version):
+
+def active_client():
+    """
+    Returns the JarSyncClient the running operation belongs to.
+
+    Module-level functions (e.g. upload_jar_files) called outside of a
+    client use a default client configured from config.
+
+    Returns:
+        JarSyncClient: Client providing the registry URL, project, group and token.
+    """
+    global _default_client
+    if _active_client is not None:
+        return _active_client
+    with _run_lock:
+        if _default_client is None:
+            _default_client = JarSyncClient()
+        return _default_client
+
+
+def init_jar_request(project_id=None, group_id_path=None, artifact_id=None, version=None, client=None):
+    """
+    Constructs the GitLab API URL and authentication headers for uploading or
+    downloading a specific JAR file from the Maven package registry.
+
+    Args:
+        project_id (str): GitLab project ID (default: the client's project).
+        group_id_path (str): Group ID path formatted with '/' (e.g., 'com/example').
+        artifact_id (str): Name of the artifact (usually the base filename).
+        version (str): Version of the artifact.
+        client (JarSyncClient): Client whose registry and token to use
+            (default: active_client()).
+
+    Returns:
+        tuple: (url, headers) where:
+            - url (str): Fully qualified GitLab Maven API endpoint for the JAR.
+            - headers (dict): Request headers including the private token.
+    """
+    client = client or active_client()
+    return (client.artifact_url(group_id_path, artifact_id, version, project_id=project_id),
+            client.auth_headers())
+
+def delete_jar(full_path, file_name):
+    """
+    Deletes a local JAR file after successful upload.
+
+    Args:
+        full_path (str): Full path to the JAR file.
+        file_name (str): File name (used for logging only).
+    """
+    try:
+        if os.path.isfile(full_path):
+            os.remove(full_path)
+            log(f"Deleted local file: {file_name}")
+        else:
+            log(f"File not found, skipping delete: {file_name}")
+    except OSError as e:
+        log(f"Failed to delete local file {file_name}: {e}")
+
+
+def write_to_json(library_json, data, compact=False):
+    """
+    Merges manifest entries into a library.json file.
+
+    New jarFilenames are appended and existing entries get their size and
+    checksum refreshed. The file is replaced atomically, so an interrupted
+    run never leaves a truncated manifest behind.
+
+    Args:
+        library_json (str): Path of the library.json file.
+        data (list): Manifest entries to merge.
+        compact (bool): Write without indentation to keep large manifests small.
+    """
+    # check if file exists
+    if os.path.isfile(library_json): 
+        with open(library_json, 'r') as rf:
+            try:
+                read_data = json.load(rf)
+            except json.JSONDecodeError:
+                # Keep the unreadable file around instead of silently dropping its entries
+                corrupt_json = f"{library_json}.corrupt"
+                shutil.copyfile(library_json, corrupt_json)
+                log(f"Unreadable manifest {library_json}, saved a copy to {corrupt_json}")
+                read_data = []
+    else:
+        read_data = []
+    
+    # check if data exsists
+    if read_data:
+        existing_jars = {item["jarFilename"]: item for item in read_data}
+
+        for jar in data:
+            jar_name = jar.get("jarFilename")
+            if jar_name not in existing_jars:
+                read_data.append(jar)
+                existing_jars[jar_name] = jar
+                log(f"Added new jar: {jar_name}")
+            else:
+                # keep recorded size/checksum in line with the latest upload
+                for key in ("size", "sha256"):
+                    if key in jar:
+                        existing_jars[jar_name][key] = jar[key]
+            
+        #save data   
+        write_json_atomic(library_json, read_data, compact=compact)
+    else:
+        log("New Json file..")
+        #save data   
+        write_json_atomic(library_json, data, compact=compact)
+        
+    
+    
+def hash_file(path, algorithm="sha256"):
+    """
+    Computes the hex digest of a file.
+
+    Args:
+        path (str): File to hash.
+        algorithm (str): hashlib algorithm name.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as rf:
+        for chunk in iter(lambda: rf.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_sync_state(lib_dir):
+    """
+    Loads the incremental sync state recorded for a directory.
+
+    The state file maps each jarFilename to the size, mtime, SHA-256 and
+    registry validators (ETag/Last-Modified) of the last download.
+
+    Args:
+        lib_dir (str): Directory containing the JARs.
+
+    Returns:
+        dict: State keyed by jarFilename (empty if none was recorded).
+    """
+    state_path = os.path.join(lib_dir, sync_state_json)
+    try:
+        with open(state_path, 'r') as rf:
+            return json.load(rf)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_sync_state(lib_dir, state):
+    """
+    Saves the incremental sync state of a directory.
+
+    Args:
+        lib_dir (str): Directory containing the JARs.
+        state (dict): State keyed by jarFilename.
+    """
+    state_path = os.path.join(lib_dir, sync_state_json)
+    write_json_atomic(state_path, state, compact=True)
+
+
+def sync_record(output_jar, sha256=None, etag=None, last_modified=None, version=None):
+    """
+    Builds the sync state entry for a JAR that is now present on disk.
+
+    Args:
+        output_jar (str): Path of the local JAR.
+        sha256 (str): Hex SHA-256 of the JAR, if known.
+        etag (str): ETag returned by the registry, if any.
+        last_modified (str): Last-Modified returned by the registry, if any.
+        version (str): Registry version the JAR was downloaded as, if known.
+
+    Returns:
+        dict: State entry for the JAR.
+    """
+    stat = os.stat(output_jar)
+    return {
+        "size": stat.st_size,
+        "mtimeNs": stat.st_mtime_ns,
+        "sha256": sha256,
+        "etag": etag,
+        "lastModified": last_modified,
+        "version": version
+    }
+
+
+def parse_jar_filename(file_name):
+    """
+    Extracts artifactId and version from a JAR filename.
+
+    Filenames are expected to follow the 'artifactId-version.jar' pattern.
+    If no version can be found, defaults to '1.0.0'.
+
+    Args:
+        file_name (str): JAR file name (e.g., 'commons-io-2.11.0.jar').
+
+    Returns:
+        tuple: (artifact_id, version)
+    """
+    matched = re.search(r'(.+)-([0-9A-Za-z\.]+)\.jar$', file_name)
+    if matched:
+        return matched.group(1), matched.group(2)
+
+    # Fallback: assign default version
+    remove_jar = re.search(r'(.+)\.jar$', file_name)
+    return remove_jar.group(1), '1.0.0'
+
+
+def put_jar(url, headers, full_path):
+    """
+    Streams a JAR to the registry with a PUT request.
+
+    The file is streamed from disk and its SHA-1, SHA-256 and MD5 are
+    computed from the bytes as they are sent (see checksums.HashingReader),
+    so the JAR is read only once. Under --max-rate the body is paced by the
+    shared bandwidth limiter. The Maven registry has no partial-upload
+    API, so an upload interrupted by a connection error is retried from the
+    start (up to config.TRANSFER_RETRIES times).
+
+    Args:
+        url (str): Registry URL of the JAR.
+        headers (dict): Authentication headers.
+        full_path (str): Path to the local JAR.
+
+    Returns:
+        tuple: (response, digests) where response is the requests.Response to
+        the final attempt and digests maps each checksums.ALGORITHMS name to
+        the hex digest of the bytes sent.
+    """
+    size = os.path.getsize(full_path)
+    attempts = 0
+    while True:
+        try:
+            with open(full_path, 'rb') as jar_file:
+                body = checksums.HashingReader(jar_file, size)
+                started = time.perf_counter()
+                response = session.get_session().put(
+                    url=url,
+                    headers=headers,
+                    data=bandwidth.ThrottledReader(body) if bandwidth.limited() else body
+                )
+            # Count TTFB from the end of the body, not the start of the request
+            instrument.note_response(response, sending=body.eof_at - started if body.eof_at else None)
+            return (response, body.hashes.hexdigests())
+        except requests.exceptions.ConnectionError as e:
+            attempts += 1
+            instrument.note_retry()
+            if attempts > config.TRANSFER_RETRIES:
+                raise
+            log(f"Upload of {os.path.basename(full_path)} interrupted, retrying: {e}")
+
+
+def put_checksums(url, headers, digests):
+    """
+    Uploads the '.sha1' and '.md5' sidecar files of a published JAR.
+
+    Maven clients expect them next to every artifact. GitLab compares an
+    uploaded checksum with the package file it stored, so a rejected
+    sidecar means the JAR did not arrive intact.
+
+    Args:
+        url (str): Registry URL of the JAR.
+        headers (dict): Authentication headers.
+        digests (dict): Hex digests of the JAR (from put_jar).
+
+    Returns:
+        int: HTTP status of the first rejected sidecar, or None if all were accepted.
+    """
+    http = session.get_session()
+    for algorithm in checksums.SIDECARS:
+        response = http.put(url=f"{url}.{algorithm}", headers=headers, data=digests[algorithm])
+        if not 200 <= response.status_code < 300:
+            return response.status_code
+    return None
+
+
+def fetch_checksum(url, headers, algorithm="sha1"):
+    """
+    Reads the checksum the registry serves for a JAR at '<url>.<algorithm>'.
+
+    Args:
+        url (str): Registry URL of the JAR.
+        headers (dict): Authentication headers.
+        algorithm (str): Checksum file extension ('sha1', 'md5', ...).
+
+    Returns:
+        str: Lower-case hex digest, or None if the registry has none.
+    """
+    response = session.get_session().get(url=f"{url}.{algorithm}", headers=headers)
+    if response.status_code != 200:
+        return None
+    return checksums.parse_checksum(response.text) or None
+
+
+def probe_published(url, headers, sha1, indexed=False):
+    """
+    Checks whether a JAR is already published in the GitLab Maven registry.
+
+    Sends a HEAD request for the JAR and, if it exists, compares the SHA-1
+    checksum the registry serves at '<url>.sha1' with the local file.
+
+    Args:
+        url (str): Registry URL of the JAR (from init_jar_request).
+        headers (dict): Authentication headers.
+        sha1 (str): Hex SHA-1 of the local JAR.
+        indexed (bool): The registry index lists the version, so the HEAD
+            request is skipped and only its checksum is fetched.
+
+    Returns:
+        str: 'missing' if not published, 'identical' if the published JAR
+        matches the local one, 'conflict' if it differs, or 'unknown' if the
+        registry checksum could not be read.
+    """
+    http = session.get_session()
+
+    if not indexed:
+        response = http.head(url=url, headers=headers, allow_redirects=True)
+        if response.status_code == 404:
+            return "missing"
+        if response.status_code != 200:
+            return "unknown"
+
+    remote_sha1 = fetch_checksum(url, headers, "sha1")
+    if remote_sha1 is None:
+        return "unknown"
+    if remote_sha1 == sha1:
+        return "identical"
+    return "conflict"
+
+
+def upload_jar(full_path, file_name, skip_published=False, keep=False, requeue=False):
+    """
+    Uploads a single JAR file to the GitLab Maven registry and deletes the
+    local copy on success (unless keep is set).
+
+    With skip_published, the registry is probed first: a JAR that is already
+    published with the same checksum is not sent again, and one published
+    with a different checksum is flagged as a conflict and left untouched.
+    Every JAR is probed; the registry index (see registry_index) only saves
+    the HEAD request for versions it already lists, since it may be stale.
+
+    The checksums of the JAR are computed while it is sent, then its
+    '.sha1'/'.md5' sidecars are uploaded (config.UPLOAD_CHECKSUMS); an
+    upload whose checksum the registry rejects counts as failed.
+
+    Transient failures (429/5xx responses, network errors) are retried with
+    backoff by retry.call(), under the run's shared concurrency limit.
+
+    Args:
+        full_path (str): Full path to the JAR file.
+        file_name (str): File name of the JAR.
+        skip_published (bool): Probe the registry before uploading.
+        keep (bool): Leave the local JAR in place after uploading.
+        requeue (bool): Return a retry.Backoff instead of waiting for a
+            retry (used by the worker pool, see transfer_pool).
+
+    Returns:
+        tuple: (manifest, status, uploaded_bytes) where:
+            - manifest (dict): library.json entry describing the JAR, including
+              its size and SHA-256.
+            - status (str): 'uploaded', 'skipped', 'conflict' or 'failed'.
+            - uploaded_bytes (int): Size of the JAR if uploaded, otherwise 0.
+    """
+    return retry.tracked(
+        "upload", file_name,
+        lambda: _upload_jar(full_path, file_name, skip_published, keep),
+        failed=lambda result: result[1] == "failed",
+        outcome=lambda result: (result[1], result[2]),
+        requeue=requeue
+    )
+
+
+def _upload_manifest(file_name):
+    """
+    Builds the library.json entry of a JAR from its file name.
+    """
+    artifact_id, version = parse_jar_filename(file_name)
+    group_id_path = active_client().group_id.replace('.', '/')
+    return {
+        "groupId": group_id_path,
+        "artifactId": artifact_id,
+        "version": version,
+        "uploadFilename": f"{artifact_id}-{version}",
+        "jarFilename": file_name,
+        "root": "/app/lib"
+    }
+
+
+def _prepare_upload(jar_file_manifest):
+    """
+    Returns the registry URL and headers to upload a manifest entry's JAR with.
+    """
+    return init_jar_request(
+        group_id_path=jar_file_manifest["groupId"],
+        artifact_id=jar_file_manifest["artifactId"],
+        version=jar_file_manifest["version"]
+    )
+
+
+def _record_published(jar_file_manifest, full_path, sha256):
+    """
+    Records the size and SHA-256 of a JAR in its manifest entry, so
+    incremental downloads can skip unchanged JARs. Only called once the
+    registry is known to hold the same bytes: the probe found an identical
+    JAR, or the upload and its checksum sidecars were all accepted.
+    """
+    jar_file_manifest["size"] = os.path.getsize(full_path)
+    jar_file_manifest["sha256"] = sha256
+
+
+def _is_indexed(jar_file_manifest):
+    """
+    Tells whether the registry index lists the version of a manifest entry.
+
+    An index that cannot be refreshed (e.g. no access to the packages API)
+    counts as not listing it, so the caller falls back to probing.
+    """
+    try:
+        index = registry_index()
+    except (requests.exceptions.RequestException, OSError, ValueError):
+        return False
+    return index.has(jar_file_manifest["groupId"], jar_file_manifest["artifactId"],
+                     jar_file_manifest["version"])
+
+
+def _published_result(published, jar_file_manifest, full_path, keep):
+    """
+    Turns a probe_published() answer into an upload result.
+
+    Returns:
+        tuple: (manifest, status, size) if the JAR must not be uploaded, else None.
+    """
+    file_name = jar_file_manifest["jarFilename"]
+    if published == "identical":
+        log(f"Already published, skipping: {file_name}")
+        if not keep:
+            delete_jar(full_path, file_name)
+        return (jar_file_manifest, "skipped", 0)
+    if published == "conflict":
+        log(f"Conflict: {file_name} is already published with a different checksum")
+        return (jar_file_manifest, "conflict", 0)
+    return None
+
+
+def _upload_result(status_code, jar_file_manifest, full_path, keep, rejected=None):
+    """
+    Turns the registry's answer to a PUT (and to its checksum sidecars,
+    see put_checksums) into an upload result.
+    """
+    file_name = jar_file_manifest["jarFilename"]
+    if status_code == 200 and rejected is not None:
+        log(f"Upload failed: {file_name} (registry rejected its checksum, HTTP {rejected})")
+        return (jar_file_manifest, "failed", 0)
+    if status_code == 200:
+        log(f"Uploaded: {file_name}")
+        if not keep:
+            delete_jar(full_path, file_name)
+        return (jar_file_manifest, "uploaded", jar_file_manifest["size"])
+
+    log(f"Upload failed: {file_name} (HTTP {status_code})")
+    return (jar_file_manifest, "failed", 0)
+
+
+def _upload_jar(full_path, file_name, skip_published, keep):
+    """
+    Performs the upload for upload_jar().
+    """
+    jar_file_manifest = _upload_manifest(file_name)
+
+    try:
+        url, headers = _prepare_upload(jar_file_manifest)
+
+        if skip_published:
+            digests = checksums.file_digests(full_path)[0].hexdigests()
+            published = probe_published(url, headers, digests["sha1"],
+                                        indexed=_is_indexed(jar_file_manifest))
+            if published == "identical":
+                _record_published(jar_file_manifest, full_path, digests["sha256"])
+            result = _published_result(published, jar_file_manifest, full_path, keep)
+            if result is not None:
+                return result
+
+        response, digests = put_jar(url, headers, full_path)
+        rejected = None
+        if response.status_code == 200 and config.UPLOAD_CHECKSUMS:
+            rejected = put_checksums(url, headers, digests)
+        # Only a fully accepted upload may vouch for the JAR in library.json
+        if response.status_code == 200 and rejected is None:
+            _record_published(jar_file_manifest, full_path, digests["sha256"])
+        return _upload_result(response.status_code, jar_file_manifest, full_path, keep, rejected)
+
+    except requests.exceptions.RequestException as e:
+        instrument.note_network_error()
+        log(f"Network error uploading {file_name}: {e}")
+    except Exception as e:
+        log(f"Unexpected error uploading {file_name}: {e}")
+
+    return (jar_file_manifest, "failed", 0)
+
+
+async def upload_jar_async(full_path, file_name, skip_published=False, keep=False, requeue=False):
+    """
+    Coroutine counterpart of upload_jar() used by the async backend.
+
+    Same arguments and result as upload_jar(); registry calls go through
+    async_backend and blocking work (hashing) runs in a worker thread.
+    """
+    return await retry.tracked_async(
+        "upload", file_name,
+        lambda: _upload_jar_async(full_path, file_name, skip_published, keep),
+        failed=lambda result: result[1] == "failed",
+        outcome=lambda result: (result[1], result[2]),
+        requeue=requeue
+    )
+
+
+async def _upload_jar_async(full_path, file_name, skip_published, keep):
+    """
+    Performs the upload for upload_jar_async().
+    """
+    jar_file_manifest = _upload_manifest(file_name)
+
+    try:
+        url, headers = _prepare_upload(jar_file_manifest)
+
+        if skip_published:
+            hashes, _ = await asyncio.to_thread(checksums.file_digests, full_path)
+            digests = hashes.hexdigests()
+            indexed = await asyncio.to_thread(_is_indexed, jar_file_manifest)
+            published = await async_backend.probe_published(url, headers, digests["sha1"], indexed)
+            if published == "identical":
+                _record_published(jar_file_manifest, full_path, digests["sha256"])
+            result = _published_result(published, jar_file_manifest, full_path, keep)
+            if result is not None:
+                return result
+
+        status_code, digests = await async_backend.put_jar(url, headers, full_path)
+        rejected = None
+        if status_code == 200 and config.UPLOAD_CHECKSUMS:
+            rejected = await async_backend.put_checksums(url, headers, digests)
+        if status_code == 200 and rejected is None:
+            _record_published(jar_file_manifest, full_path, digests["sha256"])
+        return _upload_result(status_code, jar_file_manifest, full_path, keep, rejected)
+
+    except async_backend.NETWORK_ERRORS as e:
+        instrument.note_network_error()
+        log(f"Network error uploading {file_name}: {e}")
+    except Exception as e:
+        log(f"Unexpected error uploading {file_name}: {e}")
+
+    return (jar_file_manifest, "failed", 0)
+
+
+def print_throughput(action, files, total_bytes, elapsed):
+    """
+    Prints aggregate throughput for a finished transfer run.
+
+    Args:
+        action (str): Label for the run (e.g., 'Uploaded').
+        files (int): Number of files transferred successfully.
+        total_bytes (int): Total bytes transferred.
+        elapsed (float): Wall-clock duration in seconds.
+    """
+    elapsed = max(elapsed, 1e-9)
+    mb = total_bytes / (1024 * 1024)
+    log(f"{action} {files} file(s), {mb:.2f} MB in {elapsed:.2f}s "
+          f"({files / elapsed:.2f} files/s, {mb / elapsed:.2f} MB/s)")
+
+
+def upload_directories(dir_batches, jobs=1, skip_published=False, store=None, compact=False,
+                       backend=None):
+    """
+    Uploads the JARs of several directories, optionally in parallel.
+
+    All per-file uploads share one pool of `jobs` worker threads. Directories
+    are consumed as they are produced (e.g. by a scanner generator), so
+    uploads start before the whole tree has been scanned. Each directory's
+    library.json is written as soon as every upload belonging to that
+    directory has finished, or appended to the consolidated manifest store
+    if one is given. Manifest additions are buffered and written in one batch
+    per directory; during long runs, buffered entries are also flushed every
+    config.MANIFEST_FLUSH_INTERVAL seconds so a crash loses little progress.
+
+    Args:
+        dir_batches (iterable): (lib_dir, jars) pairs where jars is a list of
+            (full_path, file_name) to upload from lib_dir.
+        jobs (int): Number of concurrent uploads (1 = sequential).
+        skip_published (bool): Skip JARs already published with the same checksum.
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+        compact (bool): Write library.json without indentation.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
+
+    Returns:
+        list: Paths of JARs that could not be uploaded, even after retries.
+    """
+    start = time.perf_counter()
+    last_flush = time.monotonic()
+    uploaded_files = 0
+    uploaded_bytes = 0
+    skipped_files = 0
+    conflicts = []
+    failures = []
+
+    manifests = {}
+    remaining = {}
+    futures = {}
+
+    def flush(lib_dir):
+        entries, manifests[lib_dir] = manifests[lib_dir], []
+        if store is not None:
+            store.add(lib_dir, entries)
+            return f"{store.db_path} ({lib_dir})"
+        # Save manifest to library.json in the same folder
+        library_json = os.path.join(lib_dir, saved_json)
+        write_to_json(library_json, entries, compact=compact)
+        return library_json
+
+    def finish_directory(lib_dir):
+        log(f"Finished uploading JARs in: {lib_dir}")
+        log(f"Manifest saved: {flush(lib_dir)}")
+        del manifests[lib_dir]
+
+    def collect(done):
+        nonlocal uploaded_files, uploaded_bytes, skipped_files, last_flush
+        for future in done:
+            lib_dir = futures.pop(future)
+            manifest, status, size = future.result()
+            manifests[lib_dir].append(manifest)
+            if status == "uploaded":
+                uploaded_files += 1
+                uploaded_bytes += size
+            elif status == "skipped":
+                skipped_files += 1
+            elif status == "conflict":
+                conflicts.append(os.path.join(lib_dir, manifest["jarFilename"]))
+            elif status == "failed":
+                failures.append(os.path.join(lib_dir, manifest["jarFilename"]))
+
+            remaining[lib_dir] -= 1
+            if remaining[lib_dir] == 0:
+                finish_directory(lib_dir)
+
+            # Checkpoint directories that are still in progress
+            if time.monotonic() - last_flush >= config.MANIFEST_FLUSH_INTERVAL:
+                for pending_dir, entries in manifests.items():
+                    if entries:
+                        flush(pending_dir)
+                last_flush = time.monotonic()
+
+    executor, upload, _ = transfer_pool(jobs, backend)
+    with executor:
+        for lib_dir, jars in dir_batches:
+            log(f"Scanning directory for JARs: {lib_dir}")
+            manifests[lib_dir] = []
+            remaining[lib_dir] = len(jars)
+            if not jars:
+                finish_directory(lib_dir)
+                continue
+
+            for full_path, file_name in jars:
+                future = executor.submit(upload, full_path, file_name, skip_published,
+                                         priority=scheduler.priority_of(lib_dir, file_name))
+                futures[future] = lib_dir
+
+            # Handle whatever finished while we were scanning, without blocking
+            collect(wait(list(futures), timeout=0, return_when=FIRST_COMPLETED).done)
+
+        collect(as_completed(list(futures)))
+
+    print_throughput("Uploaded", uploaded_files, uploaded_bytes,
+                     time.perf_counter() - start)
+    if skip_published:
+        log(f"Skipped {skipped_files} already published JAR(s)")
+        if conflicts:
+            log(f"{len(conflicts)} JAR(s) conflict with a different published version:")
+            for conflict in sorted(conflicts):
+                log(f"  {conflict}")
+    return failures
+
+
+def upload_jar_files(jar_folder_path, jobs=1, skip_published=False, store=None, compact=False,
+                     backend=None):
+    """
+    Uploads all JAR files from a given directory to the GitLab Maven registry.
+
+    Only processes files in the specified directory (non-recursive).
+    Extracts artifactId and version from filenames. If version is not found,
+    defaults to '1.0.0'. Saves a library.json manifest in the same directory.
+
+    Args:
+        jar_folder_path (str): Path to the folder containing .jar files.
+        jobs (int): Number of concurrent uploads (1 = sequential).
+        skip_published (bool): Skip JARs already published with the same checksum.
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+        compact (bool): Write library.json without indentation.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
+
+    Returns:
+        list: Paths of JARs that could not be uploaded.
+    """
+    if not os.path.isdir(jar_folder_path):
+        raise ValueError(f"Provided path is not a valid directory: {jar_folder_path}")
+
+    return upload_directories([(jar_folder_path, list_jar_files(jar_folder_path))],
+                              jobs=jobs, skip_published=skip_published, store=store, compact=compact,
+                              backend=backend)
+
+
+def upload_all_jar(jar_folder_path, jobs=1, skip_published=False,
+                   include=None, exclude=None, max_depth=None, store=None, compact=False,
+                   backend=None):
+    """
+    Uploads all JAR files from a given directory and all its subdirectories
+    to the GitLab Maven registry.
+
+    The tree is scanned recursively and uploads start as soon as the first
+    directory with JARs is found. Each directory containing JARs will have
+    its own library.json manifest created after upload.
+    Extracts artifactId and version from filenames. Defaults to version '1.0.0' if missing.
+
+    Args:
+        jar_folder_path (str): Root path containing directories with JARs.
+        jobs (int): Number of concurrent uploads shared by all directories.
+        skip_published (bool): Skip JARs already published with the same checksum.
+        include (list): Glob patterns JAR files must match (default: all JARs).
+        exclude (list): Glob patterns for directories and files to skip.
+        max_depth (int): Maximum directory depth to scan (None = unlimited).
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+        compact (bool): Write library.json without indentation.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
+
+    Returns:
+        list: Paths of JARs that could not be uploaded.
+    """
+    if not os.path.isdir(jar_folder_path):
+        raise ValueError(f"Provided path is not a valid directory: {jar_folder_path}")
+
+    dir_batches = iter_jar_dirs(jar_folder_path, include=include,
+                                exclude=exclude, max_depth=max_depth)
+    failures = upload_directories(dir_batches, jobs=jobs, skip_published=skip_published,
+                                  store=store, compact=compact, backend=backend)
+
+    log(f"\nAll JARs uploaded from: {jar_folder_path}")
+    return failures
+              
+       
+def registry_index():
+    """
+    Returns the registry version index, refreshing it once it is stale.
+
+    The index belongs to the active client (see JarSyncClient.registry_index).
+
+    Returns:
+        RegistryIndex: Index of the project's published Maven packages.
+    """
+    return active_client().registry_index()
+
+
+def resolve_versions(manifest):
+    """
+    Pins dynamic versions in manifest entries to published versions.
+
+    Entries whose version is 'latest', 'release', a '1.2.+' prefix or a
+    Maven range such as '[1.0,2.0)' are resolved to the newest matching
+    version in the registry index. The registry is only consulted if the
+    manifest contains such an entry.
+
+    Args:
+        manifest (list): library.json entries.
+
+    Returns:
+        tuple: (entries, unresolved) where entries are the manifest entries
+        with concrete versions and unresolved the dynamic entries that match
+        no published version. Without a registry index every dynamic entry
+        is unresolved.
+    """
+    if not any(is_dynamic(jar.get("version")) for jar in manifest):
+        return (manifest, [])
+
+    try:
+        index = registry_index()
+    except (requests.exceptions.RequestException, OSError, ValueError):
+        return ([jar for jar in manifest if not is_dynamic(jar.get("version"))],
+                [jar for jar in manifest if is_dynamic(jar.get("version"))])
+    entries = []
+    unresolved = []
+    for jar in manifest:
+        spec = jar.get("version")
+        if not is_dynamic(spec):
+            entries.append(jar)
+            continue
+
+        version = index.resolve(jar["groupId"], jar["artifactId"], spec)
+        if version is None:
+            log(f"No published version of {jar['artifactId']} matches '{spec}'")
+            unresolved.append(jar)
+            continue
+        log(f"Resolved {jar['artifactId']} '{spec}' to {version}")
+        entries.append(dict(jar, version=version))
+    return (entries, unresolved)
+
+
+def list_versions(pattern="*"):
+    """
+    Prints the published versions of every artifact matching a glob.
+
+    Versions uploaded more than once (duplicate packages) are flagged.
+
+    Args:
+        pattern (str): Glob matched against 'group/path/artifactId' and artifactId.
+
+    Returns:
+        int: Number of artifacts listed.
+    """
+    index = registry_index()
+    listed = 0
+    for name, versions in sorted(index.artifacts().items()):
+        artifact_id = name.rsplit("/", 1)[-1]
+        if not (fnmatch(name, pattern) or fnmatch(artifact_id, pattern)):
+            continue
+        listed += 1
+        ordered = [f"{version} (x{len(versions[version])})" if len(versions[version]) > 1 else version
+                   for version in sort_versions(versions)]
+        log(f"{name}: {', '.join(ordered)}")
+
+    collisions = [item for item in index.collisions()
+                  if fnmatch(item[0], pattern) or fnmatch(item[0].rsplit("/", 1)[-1], pattern)]
+    if collisions:
+        log(f"\n{len(collisions)} version(s) were published more than once:")
+        for name, version, ids in collisions:
+            log(f"  {name} {version}: packages {', '.join(str(package_id) for package_id in sorted(ids))}")
+    return listed
+
+
+def read_manifest(lib_dir):
+    """
+    Reads the library.json manifest of a directory.
+
+    Args:
+        lib_dir (str): Directory expected to contain a library.json file.
+
+    Returns:
+        list: Manifest entries, or None if no library.json exists.
+    """
+    save_json_path = os.path.join(lib_dir, saved_json)
+    if not os.path.isfile(save_json_path):
+        return None
+
+    with open(save_json_path, 'r') as rf:
+        data = rf.read()
+    return json.loads(data)
+
+
+def stream_download(url, headers, output_jar, expected=None):
+    """
+    Streams a registry response into a file, resuming interrupted transfers.
+
+    Bytes are written to '<output_jar>.part' in config.TRANSFER_CHUNK_SIZE
+    chunks and the part file is atomically renamed to output_jar once the
+    body is complete. A part file left behind by an earlier run, or by a
+    connection dropped mid-transfer, is continued with an HTTP Range request
+    instead of starting over (up to config.TRANSFER_RETRIES times). The
+    request carries the response's ETag in If-Range (kept in
+    '<output_jar>.part.etag'), so a JAR changed in the meantime is fetched
+    from the start; a part file without one is not resumed. Under
+    --max-rate every chunk is paced by the shared bandwidth limiter.
+
+    The SHA-1, SHA-256 and MD5 of the JAR are computed while it is written.
+    Before the part file is renamed they are checked against `expected`, or,
+    without expected digests, against the SHA-1 the registry serves at
+    '<url>.sha1' (see config.VERIFY_DOWNLOADS).
+
+    Args:
+        url (str): Registry URL of the JAR.
+        headers (dict): Request headers (authentication, conditional headers).
+        output_jar (str): Final path of the JAR.
+        expected (dict): Expected hex digest per algorithm (e.g. the SHA-256
+            recorded in library.json), or None to ask the registry.
+
+    Returns:
+        tuple: (response, digests, transferred) where:
+            - response (requests.Response): Last response from the registry.
+            - digests (dict): Hex digest of the complete JAR per
+              checksums.ALGORITHMS name, or None if the registry did not
+              return a body (e.g. 304 or an error status).
+            - transferred (int): Bytes received during this call.
+
+    Raises:
+        checksums.ChecksumMismatch: If the JAR does not match its checksum;
+            the part file is removed and output_jar is left untouched.
+    """
+    http = session.get_session()
+    part_path = f"{output_jar}.part"
+    transferred = 0
+    attempts = 0
+
+    # Pick up where a previous run stopped
+    hashes, offset, validator = checksums.resume_part(part_path, config.TRANSFER_CHUNK_SIZE)
+
+    while True:
+        request_headers = dict(headers)
+        if offset and validator:
+            request_headers["Range"] = f"bytes={offset}-"
+            request_headers["If-Range"] = validator
+
+        try:
+            response = http.get(url=url, headers=request_headers, stream=True)
+            instrument.note_response(response)
+
+            if response.status_code == 416 and offset:
+                # Stale part file, start over
+                response.close()
+                hashes = checksums.MultiHash()
+                offset = 0
+                os.remove(part_path)
+                checksums.discard_part_validator(part_path)
+                continue
+            elif response.status_code == 206:
+                mode = 'ab'
+            elif response.status_code == 200:
+                # Registry ignored the range or the JAR changed, restart from the beginning
+                hashes = checksums.MultiHash()
+                offset = 0
+                mode = 'wb'
+                validator = checksums.save_part_validator(part_path, response.headers)
+            else:
+                response.close()
+                return (response, None, transferred)
+
+            block_size = bandwidth.chunk_size(config.TRANSFER_CHUNK_SIZE)
+            with open(part_path, mode) as wf:
+                for chunk in response.iter_content(chunk_size=block_size):
+                    if chunk:
+                        bandwidth.consume(len(chunk))
+                        wf.write(chunk)
+                        hashes.update(chunk)
+                        offset += len(chunk)
+                        transferred += len(chunk)
+            break
+
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError) as e:
+            attempts += 1
+            instrument.note_retry()
+            if attempts > config.TRANSFER_RETRIES:
+                raise
+            log(f"Transfer of {os.path.basename(output_jar)} interrupted at {offset} bytes, resuming: {e}")
+
+    digests = hashes.hexdigests()
+    if config.VERIFY_DOWNLOADS:
+        if expected is None:
+            auth_headers = {name: value for name, value in headers.items() if not name.startswith("If-")}
+            expected = {"sha1": fetch_checksum(url, auth_headers, "sha1")}
+        try:
+            checksums.verify(digests, expected, os.path.basename(output_jar))
+        except checksums.ChecksumMismatch:
+            os.remove(part_path)
+            checksums.discard_part_validator(part_path)
+            raise
+
+    # Replacing the directory entry also keeps JARs hardlinked from the cache intact
+    os.replace(part_path, output_jar)
+    checksums.discard_part_validator(part_path)
+    return (response, digests, transferred)
+
+
+def download_jar(jar, lib_dir, cache=None, state=None, requeue=False):
+    """
+    Downloads a single JAR described by a manifest entry into a directory.
+
+    If an artifact cache is given, a cached copy is linked into place instead
+    of fetching it from the registry, and fresh downloads are added to it.
+
+    If a sync state is given (incremental mode), a local JAR that still
+    matches the size/SHA-256 recorded in library.json is kept as is. Without
+    a recorded checksum, the registry is asked with a conditional GET using
+    the ETag/Last-Modified of the previous download.
+
+    Downloads are verified against the SHA-256 in library.json, or the
+    registry's '.sha1' checksum, before they replace the local JAR (see
+    stream_download). A corrupted transfer is discarded and retried.
+
+    Transient failures are retried with backoff like uploads (see retry.call).
+
+    Args:
+        jar (dict): library.json entry (groupId, artifactId, version, jarFilename)
+            with a concrete version (see resolve_versions).
+        lib_dir (str): Directory the JAR is written to.
+        cache (ArtifactCache): Optional local artifact cache.
+        state (dict): Optional sync state of lib_dir, updated in place.
+        requeue (bool): Return a retry.Backoff instead of waiting for a
+            retry (used by the worker pool, see transfer_pool).
+
+    Returns:
+        tuple: (status, size) where:
+            - status (str): 'downloaded', 'cached', 'skipped' or 'failed'.
+            - size (int): Number of bytes written (0 unless transferred).
+    """
+    return retry.tracked(
+        "download", jar["jarFilename"],
+        lambda: _download_jar(jar, lib_dir, cache, state),
+        failed=lambda result: result[0] == "failed",
+        outcome=lambda result: result,
+        requeue=requeue
+    )
+
+
+def _prepare_download(jar, lib_dir, cache, state):
+    """
+    Handles the local side of a download before anything is fetched.
+
+    Returns:
+        tuple: (result, url, headers) where result is the (status, size)
+        outcome if the JAR is already up to date or was restored from the
+        cache, otherwise None together with the registry request to send.
+    """
+    group_id_path = jar["groupId"]
+    artifact_id = jar["artifactId"]
+    version = jar["version"]
+    jarFilename = jar["jarFilename"]
+    output_jar = os.path.join(lib_dir, jarFilename)
+    conditional_headers = {}
+
+    # Skip JARs that are already up to date on disk
+    if state is not None and os.path.isfile(output_jar):
+        record = state.get(jarFilename) or {}
+        stat = os.stat(output_jar)
+        unchanged = (record.get("size") == stat.st_size
+                     and record.get("mtimeNs") == stat.st_mtime_ns)
+
+        if jar.get("sha256") and jar.get("size") in (None, stat.st_size):
+            local_sha256 = record.get("sha256") if unchanged else None
+            local_sha256 = local_sha256 or hash_file(output_jar)
+            if local_sha256 == jar["sha256"]:
+                state[jarFilename] = dict(sync_record(output_jar, local_sha256),
+                                          etag=record.get("etag"),
+                                          lastModified=record.get("lastModified"))
+                log(f"Up to date: {jarFilename}")
+                return (("skipped", 0), None, None)
+        elif not jar.get("sha256") and unchanged and record.get("version") in (None, version):
+            if record.get("etag"):
+                conditional_headers["If-None-Match"] = record["etag"]
+            if record.get("lastModified"):
+                conditional_headers["If-Modified-Since"] = record["lastModified"]
+
+    # Serve released versions from the local cache when possible
+    if cache is not None:
+        size = cache.fetch(group_id_path, artifact_id, version, output_jar, sha256=jar.get("sha256"))
+        if size:
+            log(f"Restored from cache: {jarFilename}")
+            if state is not None:
+                state[jarFilename] = sync_record(output_jar)
+            return (("cached", size), None, None)
+
+    # Prepare URL and headers for download
+    url, headers = init_jar_request(
+        group_id_path=group_id_path,
+        artifact_id=artifact_id,
+        version=version
+    )
+    return (None, url, {**headers, **conditional_headers})
+
+
+def _expected_digests(jar):
+    """
+    Returns the digests a download of a manifest entry is checked against,
+    or None to use the registry's checksum (see stream_download).
+    """
+    return {"sha256": jar["sha256"]} if jar.get("sha256") else None
+
+
+def _finish_download(jar, lib_dir, cache, state, status_code, response_headers, digests, written):
+    """
+    Records a completed registry response in the cache and sync state.
+
+    Returns:
+        tuple: (status, size) result of the download.
+    """
+    jarFilename = jar["jarFilename"]
+    output_jar = os.path.join(lib_dir, jarFilename)
+
+    if status_code == 304:
+        log(f"Up to date: {jarFilename}")
+        return ("skipped", 0)
+    elif digests is not None:
+        log(f"Downloaded: {jarFilename}")
+
+        if cache is not None:
+            cache.store(jar["groupId"], jar["artifactId"], jar["version"], digests["sha256"], output_jar)
+        if state is not None:
+            state[jarFilename] = sync_record(
+                output_jar,
+                sha256=digests["sha256"],
+                etag=response_headers.get("ETag"),
+                last_modified=response_headers.get("Last-Modified"),
+                version=jar["version"]
+            )
+        return ("downloaded", written)
+
+    log(f"Download failed for {jarFilename}: HTTP {status_code}")
+    return ("failed", 0)
+
+
+def _download_jar(jar, lib_dir, cache, state):
+    """
+    Performs the download for download_jar().
+    """
+    jarFilename = jar["jarFilename"]
+
+    try:
+        result, url, headers = _prepare_download(jar, lib_dir, cache, state)
+        if result is not None:
+            return result
+
+        # Download the JAR file
+        response, digests, written = stream_download(
+            url=url,
+            headers=headers,
+            output_jar=os.path.join(lib_dir, jarFilename),
+            expected=_expected_digests(jar)
+        )
+        return _finish_download(jar, lib_dir, cache, state, response.status_code,
+                                response.headers, digests, written)
+
+    except checksums.ChecksumMismatch as e:
+        # Most likely corrupted in transit, so it is worth another attempt
+        instrument.note_network_error()
+        log(f"Checksum mismatch, download discarded: {e}")
+    except requests.exceptions.RequestException as e:
+        instrument.note_network_error()
+        log(f"Request exception for {jarFilename}: {e}")
+    except Exception as e:
+        log(f"Unexpected error while downloading {jarFilename}: {e}")
+
+    return ("failed", 0)
+
+
+async def download_jar_async(jar, lib_dir, cache=None, state=None, requeue=False):
+    """
+    Coroutine counterpart of download_jar() used by the async backend.
+
+    Same arguments and result as download_jar(); the body is streamed by
+    async_backend and local checks, hashing and cache updates run in a
+    worker thread.
+    """
+    return await retry.tracked_async(
+        "download", jar["jarFilename"],
+        lambda: _download_jar_async(jar, lib_dir, cache, state),
+        failed=lambda result: result[0] == "failed",
+        outcome=lambda result: result,
+        requeue=requeue
+    )
+
+
+async def _download_jar_async(jar, lib_dir, cache, state):
+    """
+    Performs the download for download_jar_async().
+    """
+    jarFilename = jar["jarFilename"]
+
+    try:
+        result, url, headers = await asyncio.to_thread(_prepare_download, jar, lib_dir, cache, state)
+        if result is not None:
+            return result
+
+        status_code, response_headers, digests, written = await async_backend.stream_download(
+            url=url,
+            headers=headers,
+            output_jar=os.path.join(lib_dir, jarFilename),
+            expected=_expected_digests(jar)
+        )
+        return await asyncio.to_thread(_finish_download, jar, lib_dir, cache, state, status_code,
+                                       response_headers, digests, written)
+
+    except checksums.ChecksumMismatch as e:
+        instrument.note_network_error()
+        log(f"Checksum mismatch, download discarded: {e}")
+    except async_backend.NETWORK_ERRORS as e:
+        instrument.note_network_error()
+        log(f"Request exception for {jarFilename}: {e}")
+    except Exception as e:
+        log(f"Unexpected error while downloading {jarFilename}: {e}")
+
+    return ("failed", 0)
+
+
+def transfer_pool(jobs, backend=None):
+    """
+    Creates the worker pool and per-file transfer functions for a backend.
+
+    Args:
+        jobs (int): Number of concurrent transfers.
+        backend (str): 'threads' (requests in a thread pool) or 'async'
+            (aiohttp on one event loop thread); default config.TRANSFER_BACKEND.
+
+    The pool is wrapped in a scheduler.PriorityExecutor, so queued transfers
+    start in priority order (see scheduler.priority_of). The shared retry
+    limiter is reset to `jobs` concurrent transfers for the pool's run.
+    Retries are put back in the queue once their backoff delay has passed
+    instead of keeping a worker waiting.
+
+    Returns:
+        tuple: (executor, upload, download) where executor supports
+        submit(func, *args, priority=...) and the context manager protocol,
+        and upload/download have the signatures of upload_jar() and
+        download_jar().
+    """
+    backend = backend or config.TRANSFER_BACKEND
+    # The limiter must admit as many transfers as the pool runs
+    retry.configure(jobs)
+    if backend == "async":
+        return (scheduler.PriorityExecutor(async_backend.AsyncExecutor(jobs), jobs),
+                partial(upload_jar_async, requeue=True), partial(download_jar_async, requeue=True))
+    return (scheduler.PriorityExecutor(ThreadPoolExecutor(max_workers=max(1, jobs)), jobs),
+            partial(upload_jar, requeue=True), partial(download_jar, requeue=True))
+
+
+def download_directories(lib_dirs, jobs=1, cache=None, incremental=False, store=None, backend=None):
+    """
+    Downloads the JARs listed in the library.json of several directories.
+
+    Every manifest entry from every directory is scheduled into one shared
+    pool of `jobs` worker threads, so a slow directory does not hold up the
+    others. Directories are consumed as they are produced, so downloads
+    start while the tree is still being scanned.
+
+    Entries are grouped by groupId/artifactId/version across directories:
+    each artifact is fetched once and fanned out to its other destinations
+    with a reflink or hardlink (see fan_out_jar), falling back to a copy.
+
+    Args:
+        lib_dirs (iterable): Directories whose library.json should be restored.
+        jobs (int): Number of concurrent downloads (1 = sequential).
+        cache (ArtifactCache): Optional local artifact cache.
+        incremental (bool): Only transfer JARs that changed since the last sync.
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
+
+    Returns:
+        list: Paths of JARs that could not be downloaded, even after retries.
+    """
+    start = time.perf_counter()
+    downloaded_files = 0
+    downloaded_bytes = 0
+    skipped_files = 0
+    linked_files = 0
+    saved_bytes = 0
+    failures = []
+
+    futures = {}
+    states = {}
+    # (groupId, artifactId, version) -> source path, result and destinations waiting for it
+    groups = {}
+
+    def fan_out(group, jar, lib_dir):
+        nonlocal skipped_files, linked_files, saved_bytes
+        destination = os.path.join(lib_dir, jar["jarFilename"])
+        if group["status"] == "failed":
+            failures.append(destination)
+            return
+        try:
+            status, size = fan_out_jar(group, jar, lib_dir, states.get(lib_dir))
+        except OSError as e:
+            log(f"Could not link {group['source']} to {destination}: {e}")
+            failures.append(destination)
+            return
+        if status == "skipped":
+            skipped_files += 1
+        else:
+            linked_files += 1
+            saved_bytes += size
+
+    def collect(done):
+        nonlocal skipped_files, downloaded_files, downloaded_bytes
+        for future in done:
+            group = groups[futures.pop(future)]
+            status, size = future.result()
+            group["status"] = status
+            if status == "skipped":
+                skipped_files += 1
+            elif status == "failed":
+                failures.append(group["source"])
+            else:
+                downloaded_files += 1
+                downloaded_bytes += size
+
+            for jar, lib_dir in group["waiting"]:
+                fan_out(group, jar, lib_dir)
+            group["waiting"] = []
+
+    executor, _, download = transfer_pool(jobs, backend)
+    with executor:
+        for lib_dir in lib_dirs:
+            manifest = store.entries(lib_dir) if store is not None else read_manifest(lib_dir)
+            if not manifest and store is not None:
+                log(f"No manifest entries recorded for: {lib_dir}")
+                continue
+            if manifest is None:
+                log(f"library.json not found in: {lib_dir}")
+                continue
+            manifest, unresolved = resolve_versions(manifest)
+            failures += [os.path.join(lib_dir, jar["jarFilename"]) for jar in unresolved]
+            if incremental:
+                states[lib_dir] = load_sync_state(lib_dir)
+
+            for jar in manifest:
+                key = (jar["groupId"], jar["artifactId"], jar["version"])
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = {"source": os.path.join(lib_dir, jar["jarFilename"]),
+                                   "state": states.get(lib_dir), "jarFilename": jar["jarFilename"],
+                                   "status": None, "sha256": None, "waiting": []}
+                    future = executor.submit(download, jar, lib_dir, cache, states.get(lib_dir),
+                                             priority=scheduler.priority_of(lib_dir, jar["jarFilename"], jar))
+                    futures[future] = key
+                elif group["status"] is None:
+                    group["waiting"].append((jar, lib_dir))
+                else:
+                    fan_out(group, jar, lib_dir)
+
+            # Fan out whatever finished while we were scanning, without blocking
+            collect(wait(list(futures), timeout=0, return_when=FIRST_COMPLETED).done)
+
+        collect(as_completed(list(futures)))
+
+    for lib_dir, state in states.items():
+        save_sync_state(lib_dir, state)
+
+    print_throughput("Downloaded", downloaded_files, downloaded_bytes,
+                     time.perf_counter() - start)
+    if linked_files:
+        log(f"Linked {linked_files} duplicate JAR(s) instead of downloading them again, "
+              f"saved {saved_bytes / (1024 * 1024):.2f} MB")
+    if incremental:
+        log(f"Skipped {skipped_files} unchanged JAR(s)")
+
+    if cache is not None:
+        cache.save()
+        cache.print_stats()
+    return failures
+
+
+def fan_out_jar(group, jar, lib_dir, state=None):
+    """
+    Places an artifact that was already downloaded elsewhere in this run.
+
+    The JAR is materialized with link_or_copy(), so it shares storage with
+    the first copy. Downloads always replace files with os.replace(), which
+    keeps linked copies independent of later updates.
+
+    Args:
+        group (dict): Download group with the 'source' path of the first copy.
+        jar (dict): Manifest entry to place.
+        lib_dir (str): Directory the JAR is written to.
+        state (dict): Optional sync state of lib_dir (incremental mode),
+            updated in place; an identical local copy is then left alone.
+
+    Returns:
+        tuple: (status, size) where status is 'linked' or 'skipped' and
+        size is the number of bytes that did not have to be downloaded.
+    """
+    source = group["source"]
+    destination = os.path.join(lib_dir, jar["jarFilename"])
+    if source == destination:
+        return ("skipped", 0)
+
+    size = os.path.getsize(source)
+    if state is not None and group["sha256"] is None:
+        record = (group["state"] or {}).get(group["jarFilename"]) or {}
+        group["sha256"] = record.get("sha256") or hash_file(source)
+
+    if state is not None and os.path.isfile(destination) and (
+            os.path.samefile(source, destination)
+            or (os.path.getsize(destination) == size and hash_file(destination) == group["sha256"])):
+        log(f"Up to date: {jar['jarFilename']}")
+        state[jar["jarFilename"]] = sync_record(destination, group["sha256"], version=jar["version"])
+        return ("skipped", 0)
+
+    method = link_or_copy(source, destination)
+    log(f"Linked ({method}): {destination}")
+    if state is not None:
+        state[jar["jarFilename"]] = sync_record(destination, group["sha256"], version=jar["version"])
+    return ("linked", size)
+
+
+def download_jar_files(dowload_jar_path, jobs=1, cache=None, incremental=False, store=None,
+                       backend=None):
+    """
+    Downloads JAR files from the GitLab Maven registry into the specified directory.
+
+    This function expects a 'library.json' file to exist in the given folder,
+    containing metadata for each JAR (groupId, artifactId, version, filename).
+    It retrieves each JAR using the metadata and saves them to the same folder.
+
+    Args:
+        dowload_jar_path (str): The path to the directory containing 'library.json'.
+        jobs (int): Number of concurrent downloads (1 = sequential).
+        cache (ArtifactCache): Optional local artifact cache.
+        incremental (bool): Only transfer JARs that changed since the last sync.
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
+
+    Returns:
+        list: Paths of JARs that could not be downloaded.
     """
-    Constructs the GitLab API URL and authentication headers for uploading or
-    downloading a specific JAR file from the Maven package registry.
+    return download_directories([dowload_jar_path], jobs=jobs, cache=cache,
+                                incremental=incremental, store=store, backend=backend)
+
+
+def download_all_jar(dowload_jar_path, jobs=1, cache=None, incremental=False,
+                     exclude=None, max_depth=None, store=None, backend=None):
+    """
+    Downloads JAR files from the GitLab Maven registry using metadata from
+    'library.json' files found in the specified directory and its subdirectories.
+
+    The tree is scanned recursively. For each folder containing a 'library.json', it will
+    attempt to download all listed JARs into that same folder. All entries share a single
+    download queue.
 
     Args:
-        project_id (str): GitLab project ID.
-        group_id_path (str): Group ID path formatted with '/' (e.g., 'com/example').
-        artifact_id (str): Name of the artifact (usually the base filename).
-        version (str): Version of the artifact.
+        dowload_jar_path (str): The root path where 'library.json' files are located.
+        jobs (int): Number of concurrent downloads shared by all directories.
+        cache (ArtifactCache): Optional local artifact cache.
+        incremental (bool): Only transfer JARs that changed since the last sync.
+        exclude (list): Glob patterns for directories to skip.
+        max_depth (int): Maximum directory depth to scan (None = unlimited).
+        store (ManifestStore): Optional consolidated manifest; its recorded
+            directories are used instead of scanning for library.json files.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
 
     Returns:
-        tuple: (url, headers) where:
-            - url (str): Fully qualified GitLab Maven API endpoint for the JAR.
-            - headers (dict): Request headers including the private token.
+        list: Paths of JARs that could not be downloaded.
     """
-    # Construct the URL to access the specific JAR in the Maven package registry
-    url = f"https://gitlab.ilts.com/api/v4/projects/{project_id}/packages/maven/{group_id_path}/{artifact_id}/{version}/{artifact_id}-{version}.jar"
+    if store is not None:
+        lib_dirs = store.directories(under=dowload_jar_path)
+    else:
+        # Stream every directory holding a library.json, including the main folder
+        lib_dirs = iter_manifest_dirs(dowload_jar_path, saved_json,
+                                      exclude=exclude, max_depth=max_depth)
 
-    # Authentication headers for GitLab API
-    headers = {
-        "PRIVATE-TOKEN": PRIVATE_TOKEN
-    }
+    failures = download_directories(lib_dirs, jobs=jobs, cache=cache,
+                                    incremental=incremental, store=store, backend=backend)
 
-    return (url, headers)
+    log(f"All JAR files downloaded from: {dowload_jar_path}")
+    return failures
 
-def delete_jar(full_path, file_name):
+
+def verify_tree(root, processes=None, exclude=None, max_depth=None, store=None):
     """
-    Deletes a local JAR file after successful upload.
+    Re-hashes every JAR listed in the manifests of a lib tree.
+
+    Each JAR is compared with the size and SHA-256 recorded in its manifest
+    entry. Hashing is CPU-bound, so files are checked by a pool of worker
+    processes (see checksums.verify_file) rather than threads.
 
     Args:
-        full_path (str): Full path to the JAR file.
-        file_name (str): File name (used for logging only).
+        root (str): Root of the lib tree.
+        processes (int): Number of worker processes (None = one per CPU).
+        exclude (list): Glob patterns for directories to skip.
+        max_depth (int): Maximum directory depth to scan (None = unlimited).
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+
+    Returns:
+        list: Paths of JARs that are missing or do not match their manifest.
     """
-    try:
-        if os.path.isfile(full_path):
-            os.remove(full_path)
-            print(f"Deleted local file: {file_name}")
-        else:
-            print(f"File not found, skipping delete: {file_name}")
-    except OSError as e:
-        print(f"Failed to delete local file {file_name}: {e}")
+    start = time.perf_counter()
+    if store is not None:
+        lib_dirs = store.directories(under=root)
+    else:
+        lib_dirs = iter_manifest_dirs(root, saved_json, exclude=exclude, max_depth=max_depth)
 
+    paths, sizes, digests = [], [], []
+    for lib_dir in lib_dirs:
+        manifest = (store.entries(lib_dir) if store is not None else read_manifest(lib_dir)) or []
+        for jar in manifest:
+            paths.append(os.path.join(lib_dir, jar["jarFilename"]))
+            sizes.append(jar.get("size"))
+            digests.append(jar.get("sha256"))
 
-def write_to_json(library_json,data):
-    # check if file exists
-    if os.path.isfile(library_json): 
-        with open(library_json, 'r') as rf:
-            try:
-                read_data = json.load(rf)
-            except json.JSONDecodeError:
-                read_data = []
-    else:
-        read_data = []
-    
-    # check if data exsists
-    if read_data:
-        existing_filenames = {item["jarFilename"] for item in read_data}
+    counts = {"ok": 0, "mismatch": 0, "missing": 0, "unverified": 0}
+    failures = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # Batch small JARs so worker round trips do not dominate
+        for path, status, detail in executor.map(checksums.verify_file, paths, sizes, digests,
+                                                  chunksize=16):
+            counts[status] += 1
+            if status in ("mismatch", "missing"):
+                log(f"{status.capitalize()}: {path} ({detail})")
+                failures.append(path)
 
-        for jar in data:
-            jar_name = jar.get("jarFilename")
-            if jar_name not in existing_filenames:
-                read_data.append(jar)
-                existing_filenames.add(jar_name)
-                print(f"Added new jar: {jar_name}")
-            
-        #save data   
-        with open(library_json, 'w') as wf:
-            json.dump(read_data, wf, indent=4)      
-    else:
-        print("New Json file..")
-        #save data   
-        with open(library_json, 'w') as wf:
-            json.dump(data, wf, indent=4)
-        
-    
-    
-def upload_jar_files(jar_folder_path):
+    log(f"Verified {len(paths)} JAR(s) in {time.perf_counter() - start:.2f}s: "
+          f"{counts['ok']} ok, {counts['mismatch']} mismatched, {counts['missing']} missing, "
+          f"{counts['unverified']} without checksum")
+    return failures
+
+
+def plan_sync(root, include=None, exclude=None, max_depth=None, store=None):
     """
-    Uploads all JAR files from a given directory to the GitLab Maven registry.
+    Computes the transfers needed to bring a lib tree in line with its manifests.
 
-    Only processes files in the specified directory (non-recursive).
-    Extracts artifactId and version from filenames. If version is not found,
-    defaults to '1.0.0'. Saves a library.json manifest in the same directory.
+    Every directory under root is compared in a single pass against its
+    library.json (or the consolidated manifest store) and its sync state:
+    - download: manifest entries missing locally or whose local copy differs
+    - skip: manifest entries whose local copy already matches
+    - upload: local JARs not listed in the manifest
+    - delete: JARs jarsync downloaded earlier that were since removed from
+      the manifest and are unchanged locally
+
+    Local JARs are hashed only when the sync state cannot vouch for them.
 
     Args:
-        jar_folder_path (str): Path to the folder containing .jar files.
+        root (str): Root of the lib tree.
+        include (list): Glob patterns local JARs must match to be uploaded.
+        exclude (list): Glob patterns for directories and files to skip.
+        max_depth (int): Maximum directory depth to scan (None = unlimited).
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+
+    Dynamic versions ('latest', ranges) are pinned with the registry index
+    first; entries that match no published version are listed under
+    'unresolved'.
+
+    Returns:
+        dict: Lists of plan items keyed by action ('upload', 'download',
+        'skip', 'delete'). Each item is a dict with 'dir', 'jarFilename',
+        'size' (None if unknown) and, for downloads, the manifest 'entry'.
+        'unresolved' lists the paths of entries that could not be pinned.
     """
-    data = []
+    plan = {"upload": [], "download": [], "skip": [], "delete": [], "unresolved": []}
+
+    upload_dirs = {dir_path: jars for dir_path, jars in iter_jar_dirs(
+        root, include=include, exclude=exclude, max_depth=max_depth)}
+    if store is not None:
+        manifest_dirs = store.directories(under=root)
+    else:
+        manifest_dirs = iter_manifest_dirs(root, saved_json, exclude=exclude, max_depth=max_depth)
+    lib_dirs = list(dict.fromkeys(list(manifest_dirs) + list(upload_dirs)))
 
-    # Check that the provided path is a valid directory
-    if os.path.isdir(jar_folder_path):
-        print(f"Scanning directory for JARs: {jar_folder_path}")
+    for lib_dir in lib_dirs:
+        manifest = (store.entries(lib_dir) if store is not None else read_manifest(lib_dir)) or []
+        manifest, unresolved = resolve_versions(manifest)
+        plan["unresolved"] += [os.path.join(lib_dir, jar["jarFilename"]) for jar in unresolved]
+        listed = {jar["jarFilename"] for jar in unresolved}
+        state = load_sync_state(lib_dir)
+        local_jars = {file_name: full_path for full_path, file_name in list_jar_files(lib_dir)} \
+            if os.path.isdir(lib_dir) else {}
 
-        # Iterate over each file in the given directory
-        for file_name in os.listdir(jar_folder_path):
-            full_path = os.path.join(jar_folder_path, file_name)
+        for jar in manifest:
+            file_name = jar["jarFilename"]
+            listed.add(file_name)
+            item = {"dir": lib_dir, "jarFilename": file_name, "size": jar.get("size"), "entry": jar}
 
-            # Process only .jar files
-            if os.path.isfile(full_path) and file_name.endswith(".jar"):
-                # Try to extract artifactId and version from filename
-                matched = re.search(r'(.+)-([0-9A-Za-z\.]+)\.jar$', file_name)
-                if matched:
-                    artifact_id = matched.group(1)
-                    version = matched.group(2)
+            full_path = local_jars.get(file_name)
+            if full_path is None:
+                plan["download"].append(item)
+                continue
+
+            stat = os.stat(full_path)
+            record = state.get(file_name) or {}
+            unchanged = (record.get("size") == stat.st_size
+                         and record.get("mtimeNs") == stat.st_mtime_ns)
+            if jar.get("sha256"):
+                if jar.get("size") not in (None, stat.st_size):
+                    up_to_date = False
                 else:
-                    # Fallback: assign default version
-                    remove_jar = re.search(r'(.+)\.jar$', file_name)
-                    artifact_id = remove_jar.group(1)
-                    version = '1.0.0'
-
-                group_id_path = default_group_id.replace('.', '/')
-
-                # Prepare manifest entry
-                jar_file_manifest = {
-                    "groupId": group_id_path,
-                    "artifactId": artifact_id,
-                    "version": version,
-                    "uploadFilename": f"{artifact_id}-{version}",
-                    "jarFilename": file_name,
-                    "root": "/app/lib"
-                }
-
-                data.append(jar_file_manifest)
-
-                try:
-                    url, headers = init_jar_request(
-                        project_id=project_id,
-                        group_id_path=group_id_path,
-                        artifact_id=artifact_id,
-                        version=version
-                    )
-
-                    with open(full_path, 'rb') as jar_file:
-                        response = requests.put(
-                            url=url,
-                            headers=headers,
-                            data=jar_file,
-                            stream=True
-                        )
-
-                    if response.status_code == 200:
-                        print(f"Uploaded: {file_name}")
-                        delete_jar(full_path,file_name)
-                    else:
-                        print(f"Upload failed: {file_name} (HTTP {response.status_code})")
-
-                except requests.exceptions.RequestException as e:
-                    print(f"Network error uploading {file_name}: {e}")
-                except Exception as e:
-                    print(f"Unexpected error uploading {file_name}: {e}")
-
-        print(f"Finished uploading JARs in: {jar_folder_path}")
+                    local_sha256 = record.get("sha256") if unchanged else None
+                    up_to_date = (local_sha256 or hash_file(full_path)) == jar["sha256"]
+            else:
+                # Without a checksum, trust a JAR that is untouched since jarsync wrote it
+                up_to_date = unchanged and record.get("version") in (None, jar["version"])
 
-        # Save manifest to library.json in the same folder
-        library_json = os.path.join(jar_folder_path, saved_json)
-        #with open(library_json, 'w') as wf:
-            #json.dump(data, wf, indent=4)
-        write_to_json(library_json,data)
-        print(f"Manifest saved: {library_json}")
+            plan["skip" if up_to_date else "download"].append(item)
 
-    else:
-        raise ValueError(f"Provided path is not a valid directory: {jar_folder_path}")
+        for full_path, file_name in upload_dirs.get(lib_dir, []):
+            if file_name in listed:
+                continue
+            stat = os.stat(full_path)
+            record = state.get(file_name) or {}
+            item = {"dir": lib_dir, "jarFilename": file_name, "size": stat.st_size}
+            if record.get("size") == stat.st_size and record.get("mtimeNs") == stat.st_mtime_ns:
+                plan["delete"].append(item)
+            else:
+                plan["upload"].append(item)
 
-    
-    
-def upload_all_jar(jar_folder_path):
+    return plan
+
+
+def print_sync_plan(plan, verbose=False):
     """
-    Uploads all JAR files from a given directory and all its subdirectories
-    to the GitLab Maven registry.
+    Prints the number of files and bytes per action of a sync plan.
+
+    Args:
+        plan (dict): Plan returned by plan_sync().
+        verbose (bool): Also list every upload, download and delete.
+    """
+    log("\nSync plan:")
+    for action in ("upload", "download", "skip", "delete"):
+        items = plan[action]
+        known = [item["size"] for item in items if item["size"] is not None]
+        mb = sum(known) / (1024 * 1024)
+        unknown = len(items) - len(known)
+        suffix = f" (+{unknown} of unknown size)" if unknown else ""
+        log(f"  {action:<9}{len(items):>7} file(s) {mb:>12.2f} MB{suffix}")
+
+    if plan["unresolved"]:
+        log(f"  {'unresolved':<9}{len(plan['unresolved']):>6} file(s) (no published version matches)")
+
+    if verbose:
+        for action in ("upload", "download", "delete"):
+            for item in plan[action]:
+                log(f"  {action}: {os.path.join(item['dir'], item['jarFilename'])}")
+        for path in plan["unresolved"]:
+            log(f"  unresolved: {path}")
 
-    Each directory will have its own library.json manifest created after upload.
-    Extracts artifactId and version from filenames. Defaults to version '1.0.0' if missing.
+
+def run_sync(plan, jobs=1, cache=None, skip_published=False, store=None, compact=False,
+             backend=None):
+    """
+    Executes a sync plan through one shared pool of worker threads.
+
+    Deletes are applied first. Uploads and downloads are then scheduled
+    together by priority class (see scheduler.priority_of) and, within a
+    class, largest first, so big JARs do not end up running alone at the
+    end of the run (entries of unknown size are started first). Uploaded JARs
+    are kept on disk and recorded in the sync state, so the next sync skips
+    them; their manifest entries are written once all transfers finished.
+    Failed or conflicting uploads are left out of the manifest and are
+    planned as uploads again by the next sync.
 
     Args:
-        jar_folder_path (str): Root path containing directories with JARs.
+        plan (dict): Plan returned by plan_sync().
+        jobs (int): Number of concurrent transfers.
+        cache (ArtifactCache): Optional local artifact cache for downloads.
+        skip_published (bool): Skip uploading JARs already published with the same checksum.
+        store (ManifestStore): Optional consolidated manifest used instead of library.json.
+        compact (bool): Write library.json without indentation.
+        backend (str): 'threads' or 'async' transfer backend (see transfer_pool).
+
+    Returns:
+        list: Paths of JARs that could not be transferred, even after retries.
     """
-    all_dir = [os.path.join(jar_folder_path, d)
-               for d in os.listdir(jar_folder_path)
-               if os.path.isdir(os.path.join(jar_folder_path, d))]
-    all_dir.append(jar_folder_path)
-
-    for lib_dir in all_dir:
-        data = []
-
-        if os.path.isdir(lib_dir):
-            print(f"\nProcessing directory: {lib_dir}")
-
-            for file_name in os.listdir(lib_dir):
-                full_path = os.path.join(lib_dir, file_name)
-
-                if os.path.isfile(full_path) and file_name.endswith(".jar"):
-                    matched = re.search(r'(.+)-([0-9A-Za-z\.]+)\.jar$', file_name)
-                    if matched:
-                        artifact_id = matched.group(1)
-                        version = matched.group(2)
-                    else:
-                        remove_jar = re.search(r'(.+)\.jar$', file_name)
-                        artifact_id = remove_jar.group(1)
-                        version = '1.0.0'
-
-                    group_id_path = default_group_id.replace('.', '/')
-
-                    jar_file_manifest = {
-                        "groupId": group_id_path,
-                        "artifactId": artifact_id,
-                        "version": version,
-                        "uploadFilename": f"{artifact_id}-{version}",
-                        "jarFilename": file_name,
-                        "root": "/app/lib"
-                    }
-
-                    data.append(jar_file_manifest)
-
-                    try:
-                        url, headers = init_jar_request(
-                            project_id=project_id,
-                            group_id_path=group_id_path,
-                            artifact_id=artifact_id,
-                            version=version
-                        )
-
-                        with open(full_path, 'rb') as jar_file:
-                            response = requests.put(
-                                url=url,
-                                headers=headers,
-                                data=jar_file,
-                                stream=True
-                            )
-
-                        if response.status_code == 200:
-                            print(f"Uploaded: {file_name}")
-                            delete_jar(full_path,file_name)
-                        else:
-                            print(f"Upload failed: {file_name} (HTTP {response.status_code})")
-
-                    except requests.exceptions.RequestException as e:
-                        print(f"Network error uploading {file_name}: {e}")
-                    except Exception as e:
-                        print(f"Unexpected error uploading {file_name}: {e}")
-
-            print(f"Completed upload for directory: {lib_dir}")
-
-            library_json = os.path.join(lib_dir, saved_json)
-            #with open(library_json, 'w') as wf:
-            #    json.dump(data, wf, indent=4)
-            write_to_json(library_json,data)
-            print(f"Manifest saved: {library_json}")
+    start = time.perf_counter()
+    transferred_files = 0
+    transferred_bytes = 0
+    failures = list(plan["unresolved"])
+    states = {}
+    manifests = {}
+
+    def state_of(lib_dir):
+        if lib_dir not in states:
+            states[lib_dir] = load_sync_state(lib_dir)
+        return states[lib_dir]
+
+    for item in plan["delete"]:
+        delete_jar(os.path.join(item["dir"], item["jarFilename"]), item["jarFilename"])
+        state_of(item["dir"]).pop(item["jarFilename"], None)
+
+    transfers = sorted(
+        [("upload", item) for item in plan["upload"]] + [("download", item) for item in plan["download"]],
+        # Unknown sizes (manifests written before sizes were recorded) first, then largest first
+        key=lambda task: (task[1]["size"] is not None, -(task[1]["size"] or 0))
+    )
+
+    futures = {}
+    executor, upload, download = transfer_pool(jobs, backend)
+    with executor:
+        for action, item in transfers:
+            lib_dir = item["dir"]
+            full_path = os.path.join(lib_dir, item["jarFilename"])
+            priority = scheduler.priority_of(lib_dir, item["jarFilename"], item.get("entry"))
+            if action == "upload":
+                future = executor.submit(upload, full_path, item["jarFilename"],
+                                         skip_published, True, priority=priority)
+            else:
+                os.makedirs(lib_dir, exist_ok=True)
+                future = executor.submit(download, item["entry"], lib_dir, cache, state_of(lib_dir),
+                                         priority=priority)
+            futures[future] = (action, item)
+
+        for future in as_completed(futures):
+            action, item = futures[future]
+            full_path = os.path.join(item["dir"], item["jarFilename"])
+            if action == "upload":
+                manifest, status, size = future.result()
+                # Failed and conflicting JARs stay unlisted, so the next sync plans them as uploads again
+                if status in ("uploaded", "skipped"):
+                    manifests.setdefault(item["dir"], []).append(manifest)
+                    state_of(item["dir"])[item["jarFilename"]] = sync_record(
+                        full_path, sha256=manifest["sha256"])
+            else:
+                status, size = future.result()
+
+            if status == "failed":
+                failures.append(full_path)
+            elif status not in ("skipped", "conflict"):
+                transferred_files += 1
+                transferred_bytes += size
+
+    for lib_dir, entries in manifests.items():
+        if store is not None:
+            store.add(lib_dir, entries)
         else:
-            raise ValueError(f"Invalid directory: {lib_dir}")
+            write_to_json(os.path.join(lib_dir, saved_json), entries, compact=compact)
+    for lib_dir, state in states.items():
+        save_sync_state(lib_dir, state)
+
+    print_throughput("Synced", transferred_files, transferred_bytes,
+                     time.perf_counter() - start)
+    if cache is not None:
+        cache.save()
+        cache.print_stats()
+    return failures
 
-    print(f"\nAll JARs uploaded from: {jar_folder_path}")
-              
        
-def download_jar_files(dowload_jar_path):
+class JarSyncClient:
     """
-    Recursively downloads JAR files from the GitLab Maven registry using metadata
-    from 'library.json' files found in the specified directory and all subdirectories.
+    Reusable jarsync client bound to one GitLab project.
 
-    For each folder containing a 'library.json', it will attempt to download all listed JARs
-    into that same folder.
+    Holds the registry base URL, project and group IDs, token, a pooled HTTP
+    session and the registry index, so a long-lived process (e.g. a deploy
+    orchestrator) can keep one warm client and run many uploads, downloads
+    and syncs over the same connections. Settings left out are taken from
+    config (environment / .env) when the client is created; the token is
+    only required once the registry is contacted.
+
+    The retry limiter, bandwidth limit and priority rules are shared by the
+    whole process, so operations of different clients run one at a time.
 
     Args:
-        dowload_jar_path (str): The root path where 'library.json' files are located.
+        base_url (str): Base URL of the GitLab instance (default: config.GITLAB_URL).
+        project_id (int): GitLab project holding the packages (default: config.PROJECT_ID).
+        group_id (str): Maven groupId of uploaded JARs (default: config.DEFAULT_GROUP_ID).
+        token (str): Private token (default: config.PRIVATE_TOKEN).
+        jobs (int): Number of concurrent transfers (default: config.DEFAULT_JOBS).
+        backend (str): 'threads' or 'async' (default: config.TRANSFER_BACKEND).
+        max_rate (int|str): Combined transfer rate limit, e.g. 10485760 or
+            '10M' (default: config.MAX_RATE, 0 = unlimited).
+        priorities (list): 'GLOB=CLASS' rules or (glob, priority) tuples (see scheduler).
+        index_path (str): Registry index file (default: config.REGISTRY_INDEX).
+        index_ttl (float): Registry index TTL in seconds (default: config.REGISTRY_INDEX_TTL).
+        reset_transfers (bool): Clear the transfer records (instrument.transfers)
+            at the start of every operation, so a long-lived client does not
+            accumulate them and each report covers one operation.
     """
-    # Path to the expected library.json file
-    save_json_path = os.path.join(dowload_jar_path, saved_json)
-    
-    # Check if the JSON file exists
-    if os.path.isfile(save_json_path):
-        # Read and parse the JSON file
-        with open(save_json_path, 'r') as rf:
-            data = rf.read()
-        
-        # Loop through each JAR entry in the JSON
-        for jar in json.loads(data):
-            group_id_path = jar["groupId"]
-            artifact_id = jar["artifactId"]
-            version = jar["version"]
-            jarFilename = jar["jarFilename"]
-            output_jar = os.path.join(dowload_jar_path, jarFilename)
-        
+
+    def __init__(self, base_url=None, project_id=None, group_id=None, token=None, jobs=None,
+                 backend=None, max_rate=None, priorities=None, index_path=None, index_ttl=None,
+                 reset_transfers=True):
+        self.base_url = (base_url or config.GITLAB_URL).rstrip("/")
+        self.project_id = config.PROJECT_ID if project_id is None else project_id
+        self.group_id = group_id or config.DEFAULT_GROUP_ID
+        self._token = token
+        self.jobs = jobs or config.DEFAULT_JOBS
+        self.backend = backend or config.TRANSFER_BACKEND
+        self.max_rate = bandwidth.parse_rate(config.MAX_RATE if max_rate is None else max_rate)
+        self.priorities = [scheduler.parse_priority_rule(rule) if isinstance(rule, str) else rule
+                           for rule in priorities or []]
+        self.index_path = index_path or config.REGISTRY_INDEX
+        self.index_ttl = config.REGISTRY_INDEX_TTL if index_ttl is None else index_ttl
+        self.reset_transfers = reset_transfers
+        self._session = None
+        self._index = None
+        self._index_error = None
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+
+    @property
+    def token(self):
+        """
+        Private token used for registry calls.
+
+        Raises:
+            ValueError: If none was given and config has none either.
+        """
+        return self._token or config.PRIVATE_TOKEN
+
+    @property
+    def session(self):
+        """
+        Pooled HTTP session of the client, kept open between operations.
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = session.build_session(pool_size=max(config.HTTP_POOL_SIZE, self.jobs))
+            return self._session
+
+    def artifact_url(self, group_id_path, artifact_id, version, project_id=None):
+        """
+        Returns the Maven package registry URL of a JAR.
+
+        Args:
+            group_id_path (str): Group ID path formatted with '/'.
+            artifact_id (str): Name of the artifact.
+            version (str): Version of the artifact.
+            project_id (str): GitLab project ID (default: the client's project).
+        """
+        project_id = self.project_id if project_id is None else project_id
+        return (f"{self.base_url}/api/v4/projects/{project_id}/packages/maven/"
+                f"{group_id_path}/{artifact_id}/{version}/{artifact_id}-{version}.jar")
+
+    def auth_headers(self):
+        """
+        Returns the authentication headers for GitLab API calls.
+        """
+        return {"PRIVATE-TOKEN": self.token}
+
+    def registry_index(self):
+        """
+        Returns the registry version index, refreshing it once it is stale.
+
+        The index lives in index_path and is refreshed incrementally when
+        older than index_ttl seconds. A failed refresh is printed once and
+        raised again for the rest of the operation without contacting the
+        registry.
+
+        Returns:
+            RegistryIndex: Index of the project's published Maven packages.
+
+        Raises:
+            requests.exceptions.RequestException, OSError, ValueError: If the
+            index cannot be refreshed.
+        """
+        index = self._load_index()
+        with self._index_lock:
+            if self._index_error is not None:
+                raise self._index_error
             try:
-                # Prepare URL and headers for download
-                url, headers = init_jar_request(
-                    project_id=project_id,
-                    group_id_path=group_id_path,
-                    artifact_id=artifact_id,
-                    version=version
-                )
-                
-                # Download the JAR file
-                response = requests.get(
-                    url=url,
-                    headers=headers,
-                    stream=True  # Stream the response for efficiency
-                )
-            
-                if response.status_code == 200:
-                    with open(output_jar, 'wb') as wf:
-                        for chunk in response.iter_content(chunk_size=4098):  # 4 KB chunks
-                            if chunk:
-                                wf.write(chunk)
-                    print(f"Downloaded: {jarFilename}")
-                else:
-                    print(f"Download failed for {jarFilename}: {response}")
-            
-            except requests.exceptions.RequestException as e:
-                print(f"Request exception for {jarFilename}: {e}")
-            except Exception as e:
-                print(f"Unexpected error while downloading {jarFilename}: {e}")
-    else:
-        print(f"library.json not found at: {save_json_path}")
+                index.refresh()
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                self._index_error = e
+                log(f"Registry index unavailable: {e}")
+                raise
+        return index
 
+    def _load_index(self):
+        with self._lock:
+            if self._index is None:
+                self._index = RegistryIndex(self.index_path, self.base_url, self.project_id,
+                                            self.token, ttl=self.index_ttl)
+            return self._index
 
-def download_all_jar(dowload_jar_path):
-    """
-    Downloads JAR files from the GitLab Maven registry into the specified directory.
+    @contextmanager
+    def _run(self):
+        """
+        Makes this client the active one for the duration of an operation.
 
-    This function expects a 'library.json' file to exist in the given folder,
-    containing metadata for each JAR (groupId, artifactId, version, filename).
-    It retrieves each JAR using the metadata and saves them to the same folder.
+        Installs its session as the shared one, applies its bandwidth and
+        priority settings and, with reset_transfers, clears the transfer
+        records of the previous operation (see instrument.transfers).
+
+        Raises:
+            ValueError: If no private token is configured, before any transfer starts.
+        """
+        global _active_client
+        # Fail once here rather than once per JAR
+        self.token
+        with _run_lock:
+            if self.reset_transfers:
+                instrument.reset()
+            self._index_error = None
+            previous_client, _active_client = _active_client, self
+            previous_session = session.use_session(self.session)
+            bandwidth.configure(self.max_rate)
+            scheduler.configure(self.priorities)
+            try:
+                yield
+            finally:
+                session.use_session(previous_session)
+                _active_client = previous_client
+
+    def upload(self, path, recursive=False, skip_published=None, include=None, exclude=None,
+               max_depth=None, store=None, compact=None):
+        """
+        Uploads the JARs of a folder (see upload_jar_files / upload_all_jar).
+
+        Args:
+            path (str): Folder to upload from.
+            recursive (bool): Include subdirectories.
+            skip_published (bool): Skip JARs already published (default: config.SKIP_PUBLISHED).
+            include (list): Glob patterns JAR files must match (recursive only).
+            exclude (list): Glob patterns for directories and files to skip.
+            max_depth (int): Maximum directory depth to scan (None = unlimited).
+            store (ManifestStore): Optional consolidated manifest used instead of library.json.
+            compact (bool): Write library.json without indentation (default: config.MANIFEST_COMPACT).
+
+        Returns:
+            list: Paths of JARs that could not be uploaded.
+        """
+        skip_published = config.SKIP_PUBLISHED if skip_published is None else skip_published
+        compact = config.MANIFEST_COMPACT if compact is None else compact
+        with self._run():
+            if recursive:
+                return upload_all_jar(path, jobs=self.jobs, skip_published=skip_published,
+                                      include=include, exclude=exclude, max_depth=max_depth,
+                                      store=store, compact=compact, backend=self.backend)
+            return upload_jar_files(path, jobs=self.jobs, skip_published=skip_published,
+                                    store=store, compact=compact, backend=self.backend)
+
+    def download(self, path, recursive=False, cache=None, incremental=None, exclude=None,
+                 max_depth=None, store=None):
+        """
+        Downloads the JARs listed in library.json (see download_jar_files / download_all_jar).
+
+        Args:
+            path (str): Folder holding library.json.
+            recursive (bool): Include every library.json in subdirectories.
+            cache (ArtifactCache): Optional local artifact cache.
+            incremental (bool): Only transfer changed JARs (default: config.INCREMENTAL).
+            exclude (list): Glob patterns for directories to skip (recursive only).
+            max_depth (int): Maximum directory depth to scan (None = unlimited).
+            store (ManifestStore): Optional consolidated manifest used instead of library.json.
+
+        Returns:
+            list: Paths of JARs that could not be downloaded.
+        """
+        incremental = config.INCREMENTAL if incremental is None else incremental
+        with self._run():
+            if recursive:
+                return download_all_jar(path, jobs=self.jobs, cache=cache, incremental=incremental,
+                                        exclude=exclude, max_depth=max_depth, store=store,
+                                        backend=self.backend)
+            return download_jar_files(path, jobs=self.jobs, cache=cache, incremental=incremental,
+                                      store=store, backend=self.backend)
+
+    def sync(self, path, dry_run=False, cache=None, skip_published=None, include=None,
+             exclude=None, max_depth=None, store=None, compact=None):
+        """
+        Plans and, unless dry_run is set, runs a sync of a tree (see plan_sync / run_sync).
+
+        Returns:
+            tuple: (plan, failures) with the plan_sync() plan and the paths
+            of JARs that could not be transferred.
+        """
+        skip_published = config.SKIP_PUBLISHED if skip_published is None else skip_published
+        compact = config.MANIFEST_COMPACT if compact is None else compact
+        with self._run():
+            plan = plan_sync(path, include=include, exclude=exclude, max_depth=max_depth, store=store)
+            print_sync_plan(plan, verbose=dry_run)
+            if dry_run:
+                return (plan, [])
+            return (plan, run_sync(plan, jobs=self.jobs, cache=cache, skip_published=skip_published,
+                                   store=store, compact=compact, backend=self.backend))
+
+    def verify(self, path, processes=None, exclude=None, max_depth=None, store=None):
+        """
+        Re-hashes the JARs of a tree against their manifests (see verify_tree).
+
+        Returns:
+            list: Paths of JARs that are missing or do not match.
+        """
+        return verify_tree(path, processes=processes, exclude=exclude, max_depth=max_depth,
+                           store=store)
+
+    def list_versions(self, pattern="*"):
+        """
+        Prints the published versions of artifacts matching a glob (see list_versions).
+
+        Returns:
+            int: Number of artifacts listed.
+        """
+        with self._run():
+            return list_versions(pattern)
+
+    def refresh_index(self, full=True):
+        """
+        Refreshes the registry index, from scratch by default.
+
+        Returns:
+            int: Number of package versions added.
+        """
+        with self._run():
+            return self._load_index().refresh(full=full, force=True)
+
+    def connection_stats(self):
+        """
+        Counts the connections opened and reused by the client.
+
+        Returns:
+            tuple: (opened, reused)
+        """
+        if self.backend == "async":
+            return async_backend.connection_stats()
+        return session.connection_stats(self._session)
+
+    def close(self):
+        """
+        Closes the client's HTTP session.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
 
-    Args:
-        dowload_jar_path (str): The path to the directory containing 'library.json'.
-    """
-    
-    # Collect all subdirectories including the main folder
-    all_dir = [os.path.join(dowload_jar_path, d) for d in os.listdir(dowload_jar_path)
-               if os.path.isdir(os.path.join(dowload_jar_path, d))]
-    all_dir.append(dowload_jar_path)
-
-    # Process each directory
-    for lib_dir in all_dir:
-        save_json_path = os.path.join(lib_dir, saved_json)
-        
-        # Check for the presence of library.json in each directory
-        if os.path.isfile(save_json_path):
-            with open(save_json_path, 'r') as rf:
-                data = rf.read()
-            
-            # Loop through the JAR entries in the JSON file
-            for jar in json.loads(data):
-                group_id_path = jar["groupId"]
-                artifact_id = jar["artifactId"]
-                version = jar["version"]
-                jarFilename = jar["jarFilename"]
-                output_jar = os.path.join(lib_dir, jarFilename)
-            
-                try:
-                    url, headers = init_jar_request(
-                        project_id=project_id,
-                        group_id_path=group_id_path,
-                        artifact_id=artifact_id,
-                        version=version
-                    )
-                    
-                    response = requests.get(
-                        url=url,
-                        headers=headers,
-                        stream=True
-                    )
-                
-                    if response.status_code == 200:
-                        with open(output_jar, 'wb') as wf:
-                            for chunk in response.iter_content(chunk_size=4098):
-                                if chunk:
-                                    wf.write(chunk)
-                        print(f"Downloaded: {jarFilename}")
-                    else:
-                        print(f"Download failed for {jarFilename}: {response}")
-                
-                except requests.exceptions.RequestException as e:
-                    print(f"Request exception for {jarFilename}: {e}")
-                except Exception as e:
-                    print(f"Unexpected error while downloading {jarFilename}: {e}")
-        else:
-            print(f"library.json not found in: {lib_dir}")
 
-    print(f"All JAR files downloaded from: {dowload_jar_path}")
-       
 def main():
     """
     Command-line entry point for the Library Manager tool.
@@ -406,12 +2052,34 @@ def main():
     - Upload all JARs from a folder including subdirectories
     - Download JARs using library.json from a specific folder
     - Download all JARs using library.json from all subdirectories
+    - Sync a whole tree against its manifests from one up-front plan
 
     Flags:
     -u / --upload         : Upload JARs from a given directory (default path if none given)
     -a / --upload-all     : Upload all JARs from all subdirectories (default path if none given)
     -d / --download       : Download JARs using library.json in a given folder
     -o / --download-all   : Download all JARs using library.json in folder and subfolders
+    --sync                : Plan and run all uploads/downloads/deletes for a tree at once
+    --verify              : Re-hash every JAR of a tree against its manifest (process pool)
+    -n / --dry-run        : Print the --sync plan without transferring anything
+    -j / --jobs           : Number of JARs to transfer in parallel
+    --backend             : Transfer backend, 'threads' (requests) or 'async' (aiohttp)
+    --max-rate            : Combined bandwidth limit of all transfers (e.g. 10M)
+    --priority            : GLOB=high|normal|low rule ordering queued transfers
+    --cache-dir           : Local artifact cache used by downloads
+    --cache-size          : Size cap of the artifact cache in MB
+    -i / --incremental    : Only download JARs that changed since the last sync
+    -s / --skip-published : Skip uploading JARs already in the registry
+    --include / --exclude : Glob filters for the recursive directory scan
+    --max-depth           : Maximum depth of the recursive directory scan
+    -m / --manifest-db    : Use a single consolidated manifest store
+    --import-manifests    : Import per-folder library.json files into the store
+    --export-manifests    : Export the store back to per-folder library.json files
+    --compact-json        : Write library.json files without indentation
+    --list-versions       : List published versions from the registry index
+    --refresh-index       : Rebuild the registry index from the GitLab packages API
+    --report              : Write per-transfer timings to a JSON/JSON lines report
+    --prometheus          : Write run metrics as a Prometheus textfile
     """
     parser = argparse.ArgumentParser(
         prog="Library Manager",
@@ -453,37 +2121,301 @@ def main():
         const=config.DOWNLOADED_JAR_PATH,
         help="Download JARs using the library.json file from the specified folder only (default: config.DOWNLOADED_JAR_PATH)"
     )
-    
+
+    # Plan and run every transfer of a tree in one scheduler
+    parser.add_argument(
+        "--sync",
+        type=str,
+        nargs="?",
+        const=config.DOWNLOADED_JAR_PATH,
+        help="Compare every manifest under the folder with the local JARs and upload, download or delete what differs (default: config.DOWNLOADED_JAR_PATH)"
+    )
+
+    # Check local JARs against their manifest checksums
+    parser.add_argument(
+        "--verify",
+        type=str,
+        nargs="?",
+        const=config.DOWNLOADED_JAR_PATH,
+        help="Re-hash every JAR listed in the library.json files under the folder and report missing or corrupted ones; -j sets the number of processes (default: config.DOWNLOADED_JAR_PATH, one process per CPU)"
+    )
+
+    parser.add_argument(
+        "-n", "--dry-run",
+        action="store_true",
+        help="With --sync, only print the plan and its total size"
+    )
+
+    # Number of concurrent transfers
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        help="Number of JARs to transfer in parallel (default: config.DEFAULT_JOBS)"
+    )
+
+    # Blocking requests in a thread pool, or aiohttp on a single event loop thread
+    parser.add_argument(
+        "--backend",
+        choices=["threads", "async"],
+        help="Transfer backend; 'async' needs aiohttp and suits hundreds of concurrent small JARs (default: config.TRANSFER_BACKEND)"
+    )
+
+    # Bandwidth shaping and priorities for runs on shared hosts
+    parser.add_argument(
+        "--max-rate",
+        type=bandwidth.parse_rate,
+        metavar="RATE",
+        help="Limit the combined rate of all transfers, e.g. 500K or 10M bytes/s; 0 for unlimited (default: config.MAX_RATE)"
+    )
+
+    parser.add_argument(
+        "--priority",
+        type=scheduler.parse_priority_rule,
+        action="append",
+        metavar="GLOB=CLASS",
+        help="Start JARs whose name, directory or path matches GLOB in CLASS (high, normal or low) order; first match wins, a 'priority' field in library.json overrides (repeatable)"
+    )
+
+    # Local artifact cache for downloads
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Serve downloads from a local artifact cache in this folder (default: config.CACHE_DIR, disabled if unset)"
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        help="Maximum size of the artifact cache in MB, 0 for unlimited (default: config.CACHE_MAX_MB)"
+    )
+
+    # Only transfer JARs that changed since the last download
+    parser.add_argument(
+        "-i", "--incremental",
+        action="store_true",
+        default=None,
+        help="Skip JARs whose local copy already matches library.json or the registry (default: config.INCREMENTAL)"
+    )
+
+    # Probe the registry and skip JARs that are already published
+    parser.add_argument(
+        "-s", "--skip-published",
+        action="store_true",
+        default=None,
+        help="Skip uploading JARs already published with the same checksum and flag conflicting ones (default: config.SKIP_PUBLISHED)"
+    )
+
+    # Filters for the recursive directory scan of --upload-all / --download-all
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="Only upload JARs matching this glob (repeatable, --upload-all only)"
+    )
+
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip directories and files matching this glob (repeatable)"
+    )
+
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="Maximum directory depth scanned by --upload-all / --download-all (default: unlimited)"
+    )
+
+    # Consolidated manifest store shared by all directories
+    parser.add_argument(
+        "-m", "--manifest-db",
+        type=str,
+        help="Record and read manifests in this single SQLite store instead of per-folder library.json (default: config.MANIFEST_DB)"
+    )
+
+    parser.add_argument(
+        "--import-manifests",
+        type=str,
+        metavar="PATH",
+        help="Import every library.json under PATH into the --manifest-db store"
+    )
+
+    parser.add_argument(
+        "--export-manifests",
+        type=str,
+        metavar="PATH",
+        help="Write the --manifest-db store back out as library.json files under PATH"
+    )
+
+    # Smaller manifests for directories with thousands of JARs
+    parser.add_argument(
+        "--compact-json",
+        action="store_true",
+        default=None,
+        help="Write library.json files without indentation (default: config.MANIFEST_COMPACT)"
+    )
+
+    # Local index of the packages published in the registry
+    parser.add_argument(
+        "--list-versions",
+        type=str,
+        nargs="?",
+        const="*",
+        metavar="GLOB",
+        help="List the published versions of artifacts matching GLOB and flag versions uploaded twice (default: all)"
+    )
+
+    parser.add_argument(
+        "--refresh-index",
+        action="store_true",
+        help="Rebuild the registry index (config.REGISTRY_INDEX) from scratch before running"
+    )
+
+    # Machine-readable instrumentation of every transfer
+    parser.add_argument(
+        "--report",
+        type=str,
+        metavar="PATH",
+        help="Write per-transfer timings and a run summary to PATH (.json, or .jsonl for JSON lines)"
+    )
+
+    parser.add_argument(
+        "--prometheus",
+        type=str,
+        metavar="PATH",
+        help="Write run metrics to PATH in the Prometheus textfile collector format"
+    )
+
     args = parser.parse_args()
-    
-    print("=" * 60)
-    print("Library Manager - GitLab JAR Upload/Download Tool")
-    print("=" * 60)
+    started = time.perf_counter()
+
+    # Options left out on the command line come from config, resolved only now
+    defaults = {
+        "jobs": lambda: config.DEFAULT_JOBS,
+        "backend": lambda: config.TRANSFER_BACKEND,
+        "max_rate": lambda: bandwidth.parse_rate(config.MAX_RATE),
+        "cache_dir": lambda: config.CACHE_DIR,
+        "cache_size": lambda: config.CACHE_MAX_MB,
+        "incremental": lambda: config.INCREMENTAL,
+        "skip_published": lambda: config.SKIP_PUBLISHED,
+        "max_depth": lambda: config.SCAN_MAX_DEPTH,
+        "manifest_db": lambda: config.MANIFEST_DB,
+        "compact_json": lambda: config.MANIFEST_COMPACT
+    }
+    for name, default in defaults.items():
+        if getattr(args, name) is None:
+            setattr(args, name, default())
+
+    if args.backend == "async" and not async_backend.available():
+        parser.error("--backend async requires aiohttp (pip install aiohttp)")
+
+    log("=" * 60)
+    log("Library Manager - GitLab JAR Upload/Download Tool")
+    log("=" * 60)
 
     # Show help if no operation is specified
-    if args.upload_all is None and args.download is None and args.upload is None and args.download_all is None:
-        print("\nNo operation specified. Please provide at least one option.\n")
+    if (args.upload_all is None and args.download is None and args.upload is None and args.download_all is None
+            and args.sync is None and args.verify is None and args.import_manifests is None and args.export_manifests is None
+            and args.list_versions is None and not args.refresh_index):
+        log("\nNo operation specified. Please provide at least one option.\n")
         parser.print_help()
         return
 
+    if args.max_rate:
+        log(f"Transfer rate limited to {args.max_rate / (1024 * 1024):.2f} MB/s")
+
+    # Concurrency starts at --jobs and backs off when GitLab rate limits us
+    # The report covers every operation of the command line
+    client = JarSyncClient(jobs=args.jobs, backend=args.backend, max_rate=args.max_rate,
+                           priorities=args.priority, reset_transfers=False)
+    network_operations = (args.upload_all, args.upload, args.download_all, args.download,
+                          args.sync, args.list_versions)
+    if args.refresh_index or any(operation is not None for operation in network_operations):
+        try:
+            client.token
+        except ValueError as e:
+            parser.error(str(e))
+    cache = ArtifactCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+
+    if (args.import_manifests or args.export_manifests) and not args.manifest_db:
+        parser.error("--import-manifests/--export-manifests require --manifest-db")
+    store = ManifestStore(args.manifest_db) if args.manifest_db else None
+    failures = []
+
     # Perform operations based on parsed arguments
+    if args.refresh_index:
+        added = client.refresh_index(full=True)
+        log(f"\nRegistry index rebuilt: {added} package version(s) in {client.index_path}")
+
+    if args.list_versions is not None:
+        log(f"\nPublished versions matching: {args.list_versions}")
+        if not client.list_versions(args.list_versions):
+            log("No matching artifacts found")
+
+    if args.import_manifests is not None:
+        count = store.import_tree(args.import_manifests, saved_json,
+                                  exclude=args.exclude, max_depth=args.max_depth)
+        log(f"\nImported {count} manifest(s) from: {args.import_manifests}")
+
     if args.upload_all is not None:
-        print(f"\nUploading all JARs from: {args.upload_all or config.JAR_FOLDER_PATH}")
-        upload_all_jar(args.upload_all)
-        
+        log(f"\nUploading all JARs from: {args.upload_all or config.JAR_FOLDER_PATH}")
+        failures += client.upload(args.upload_all, recursive=True, skip_published=args.skip_published,
+                                  include=args.include, exclude=args.exclude, max_depth=args.max_depth,
+                                  store=store, compact=args.compact_json)
+
     if args.upload is not None:
-        print(f"\nUploading JARs from directory (no subdirectories): {args.upload or config.JAR_FOLDER_PATH}")
-        upload_jar_files(args.upload)
+        log(f"\nUploading JARs from directory (no subdirectories): {args.upload or config.JAR_FOLDER_PATH}")
+        failures += client.upload(args.upload, skip_published=args.skip_published,
+                                  store=store, compact=args.compact_json)
     
     if args.download_all is not None:
-        print(f"\nDownloading all JARs from: {args.download_all or config.DOWNLOADED_JAR_PATH}")
-        download_all_jar(args.download_all)
+        log(f"\nDownloading all JARs from: {args.download_all or config.DOWNLOADED_JAR_PATH}")
+        failures += client.download(args.download_all, recursive=True, cache=cache,
+                                    incremental=args.incremental, exclude=args.exclude,
+                                    max_depth=args.max_depth, store=store)
     
     if args.download is not None:
-        print(f"\nDownloading JARs from: {args.download or config.DOWNLOADED_JAR_PATH}")
-        download_jar_files(args.download)
+        log(f"\nDownloading JARs from: {args.download or config.DOWNLOADED_JAR_PATH}")
+        failures += client.download(args.download, cache=cache, incremental=args.incremental,
+                                    store=store)
+
+    if args.sync is not None:
+        log(f"\nPlanning sync of: {args.sync}")
+        _, sync_failures = client.sync(args.sync, dry_run=args.dry_run, cache=cache,
+                                       skip_published=args.skip_published, include=args.include,
+                                       exclude=args.exclude, max_depth=args.max_depth,
+                                       store=store, compact=args.compact_json)
+        failures += sync_failures
+
+    if args.verify is not None:
+        log(f"\nVerifying JARs in: {args.verify}")
+        failures += client.verify(args.verify, processes=args.jobs if args.jobs > 1 else None,
+                                  exclude=args.exclude, max_depth=args.max_depth, store=store)
+
+    if args.export_manifests is not None:
+        count = store.export_tree(args.export_manifests, saved_json, compact=args.compact_json)
+        log(f"\nExported {count} manifest(s) to: {args.export_manifests}")
+
+    if store is not None:
+        store.close()
+
+    opened, reused = client.connection_stats()
+    log(f"Connections opened: {opened}, reused: {reused}")
+    client.close()
+
+    if args.report:
+        instrument.write_report(args.report, time.perf_counter() - started)
+        log(f"Report saved: {args.report}")
+    if args.prometheus:
+        instrument.write_prometheus(args.prometheus, time.perf_counter() - started)
+        log(f"Prometheus metrics saved: {args.prometheus}")
 
-    print("\nOperation completed.\n")
+    if failures:
+        log(f"\n{len(failures)} JAR(s) failed permanently:")
+        for failure in sorted(failures):
+            log(f"  {failure}")
+        sys.exit(1)
+    log("\nOperation completed.\n")
 
 # Only run main if this script is executed directly
 if __name__ == '__main__':
@@ -0,0 +1,64 @@
+import os
+import json
+import stat
+import tempfile
+
+# Process umask, read once at import: os.umask() can only be read by setting it,
+# which would briefly affect files created by other threads
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_json_atomic(path, data, compact=False):
+    """
+    Writes JSON to a file so that readers never see a partial file.
+
+    The data is written to a temporary file in the same directory, flushed
+    and fsynced, then renamed over the target. A crash mid-write leaves the
+    previous file intact instead of a truncated one. The file keeps the
+    permissions of the file it replaces, or gets the umask default if new
+    (mkstemp alone would leave it readable by its owner only).
+
+    Args:
+        path (str): Destination file.
+        data: JSON-serializable object.
+        compact (bool): Write without indentation or extra whitespace.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as wf:
+            if compact:
+                json.dump(data, wf, separators=(',', ':'))
+            else:
+                json.dump(data, wf, indent=4)
+            wf.flush()
+            os.fsync(wf.fileno())
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def _file_mode(path):
+    """
+    Returns the permission bits a rewrite of path should get.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
@@ -0,0 +1,177 @@
+import os
+import json
+import sqlite3
+from scanner import iter_manifest_dirs
+from jsonio import write_json_atomic
+from console import log
+
+
+class ManifestStore:
+    """
+    Consolidated manifest of every directory, kept in a single SQLite file.
+
+    Entries are keyed by (directory, jarFilename) and hold the same fields as
+    a per-folder library.json entry. Directories are stored relative to the
+    folder containing the database, so the store can be moved together with
+    the lib tree it describes.
+
+    Args:
+        db_path (str): Path of the SQLite database (created if missing).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        self.root = os.path.dirname(self.db_path)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            " directory TEXT NOT NULL,"
+            " jar_filename TEXT NOT NULL,"
+            " entry TEXT NOT NULL,"
+            " PRIMARY KEY (directory, jar_filename)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def _key(self, lib_dir):
+        rel_dir = os.path.relpath(os.path.abspath(lib_dir), self.root)
+        return rel_dir.replace(os.sep, '/')
+
+    def _path(self, directory):
+        return os.path.normpath(os.path.join(self.root, directory))
+
+    def add(self, lib_dir, data):
+        """
+        Adds manifest entries for a directory in a single transaction.
+
+        Follows write_to_json: new jarFilenames are appended, while existing
+        entries keep their fields except for an updated size/checksum.
+
+        Args:
+            lib_dir (str): Directory the JARs belong to.
+            data (list): library.json entries for the directory.
+        """
+        directory = self._key(lib_dir)
+        existing = {entry["jarFilename"]: entry for entry in self.entries(lib_dir)}
+
+        rows = []
+        for jar in data:
+            jar_name = jar.get("jarFilename")
+            if jar_name in existing:
+                entry = existing[jar_name]
+                for key in ("size", "sha256"):
+                    if key in jar:
+                        entry[key] = jar[key]
+            else:
+                entry = jar
+                log(f"Added new jar: {jar_name}")
+            rows.append((directory, jar_name, json.dumps(entry)))
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO manifest (directory, jar_filename, entry) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def get(self, lib_dir, jar_filename):
+        """
+        Looks up a single manifest entry.
+
+        Args:
+            lib_dir (str): Directory the JAR belongs to.
+            jar_filename (str): File name of the JAR.
+
+        Returns:
+            dict: The manifest entry, or None if it is not recorded.
+        """
+        row = self._conn.execute(
+            "SELECT entry FROM manifest WHERE directory = ? AND jar_filename = ?",
+            (self._key(lib_dir), jar_filename)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def entries(self, lib_dir):
+        """
+        Returns the manifest entries of a directory.
+
+        Args:
+            lib_dir (str): Directory to look up.
+
+        Returns:
+            list: library.json entries (empty if the directory is unknown).
+        """
+        rows = self._conn.execute(
+            "SELECT entry FROM manifest WHERE directory = ? ORDER BY jar_filename",
+            (self._key(lib_dir),)
+        )
+        return [json.loads(entry) for (entry,) in rows]
+
+    def directories(self, under=None):
+        """
+        Lists the directories recorded in the store.
+
+        Args:
+            under (str): Only return directories inside this folder.
+
+        Returns:
+            list: Absolute directory paths.
+        """
+        rows = self._conn.execute("SELECT DISTINCT directory FROM manifest ORDER BY directory")
+        lib_dirs = [self._path(directory) for (directory,) in rows]
+        if under is None:
+            return lib_dirs
+
+        under = os.path.abspath(under)
+        return [lib_dir for lib_dir in lib_dirs
+                if lib_dir == under or lib_dir.startswith(under + os.sep)]
+
+    def import_tree(self, root, manifest_name, exclude=None, max_depth=None):
+        """
+        Loads every per-folder library.json under a tree into the store.
+
+        Args:
+            root (str): Root of the lib tree.
+            manifest_name (str): Per-folder manifest name (e.g. 'library.json').
+            exclude (list): Glob patterns for directories to skip.
+            max_depth (int): Maximum directory depth to scan (None = unlimited).
+
+        Returns:
+            int: Number of directories imported.
+        """
+        count = 0
+        for lib_dir in iter_manifest_dirs(root, manifest_name, exclude=exclude, max_depth=max_depth):
+            with open(os.path.join(lib_dir, manifest_name), 'r') as rf:
+                try:
+                    data = json.load(rf)
+                except json.JSONDecodeError:
+                    log(f"Skipping unreadable manifest in: {lib_dir}")
+                    continue
+            self.add(lib_dir, data)
+            count += 1
+        return count
+
+    def export_tree(self, root, manifest_name, compact=False):
+        """
+        Writes the store back out as per-folder library.json files.
+
+        Args:
+            root (str): Only export directories inside this folder.
+            manifest_name (str): Per-folder manifest name (e.g. 'library.json').
+            compact (bool): Write without indentation.
+
+        Returns:
+            int: Number of manifests written.
+        """
+        count = 0
+        for lib_dir in self.directories(under=root):
+            os.makedirs(lib_dir, exist_ok=True)
+            write_json_atomic(os.path.join(lib_dir, manifest_name),
+                              self.entries(lib_dir), compact=compact)
+            count += 1
+        return count
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+        """
+        self._conn.close()
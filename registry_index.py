@@ -0,0 +1,278 @@
+import os
+import json
+import re
+import threading
+import time
+from functools import cmp_to_key
+import session
+from jsonio import write_json_atomic
+
+# Packages requested per page from the GitLab packages API (its maximum)
+PAGE_SIZE = 100
+
+# Qualifier order used when comparing Maven versions; unknown qualifiers sort after releases
+QUALIFIERS = {"alpha": 0, "a": 0, "beta": 1, "b": 1, "milestone": 2, "m": 2,
+              "rc": 3, "cr": 3, "snapshot": 4, "": 5, "ga": 5, "final": 5, "release": 5, "sp": 6}
+
+RANGE_PART = re.compile(r"([\[(])([^\[\]()]*)([\])])")
+
+
+def version_key(version):
+    """
+    Builds a sort key that orders versions the way Maven does.
+
+    Numeric parts compare as numbers, trailing zeros are ignored
+    (1.0 == 1.0.0) and qualifiers sort below the release they belong to
+    (1.0-alpha < 1.0-rc1 < 1.0-SNAPSHOT < 1.0 < 1.0-sp1).
+
+    Args:
+        version (str): Version string.
+
+    Returns:
+        tuple: Key usable with sorted() and max().
+    """
+    key = []
+    run = []
+    for token in re.findall(r"\d+|[A-Za-z]+", version.lower()):
+        if token.isdigit():
+            run.append((2, int(token), ""))
+            continue
+        while run and run[-1][1] == 0:
+            run.pop()
+        key += run
+        run = []
+        key.append((1, QUALIFIERS.get(token, 5), "" if token in QUALIFIERS else token))
+    while run and run[-1][1] == 0:
+        run.pop()
+    key += run
+    return tuple(key)
+
+
+def _compare(left, right):
+    # Missing trailing parts count as a plain release
+    pad = (1, 5, "")
+    length = max(len(left), len(right))
+    left = left + (pad,) * (length - len(left))
+    right = right + (pad,) * (length - len(right))
+    return (left > right) - (left < right)
+
+
+def is_dynamic(version):
+    """
+    Tells whether a manifest version must be resolved against the registry.
+
+    Dynamic versions are 'latest' (any version), 'release' (latest
+    non-SNAPSHOT), prefixes such as '1.2.+' and Maven ranges such as
+    '[1.0,2.0)'.
+    """
+    version = (version or "").strip()
+    return (version.lower() in ("latest", "release") or version.endswith("+")
+            or version.startswith("[") or version.startswith("("))
+
+
+def matches(version, spec):
+    """
+    Checks a concrete version against a dynamic version spec.
+
+    Args:
+        version (str): Concrete version from the registry.
+        spec (str): 'latest', 'release', a '1.2.+' prefix or a Maven range
+            (e.g. '[1.0,2.0)', '[1.5,)', '(,1.0],[1.2,)').
+
+    Returns:
+        bool: True if the version satisfies the spec.
+    """
+    spec = spec.strip()
+    if spec.lower() == "latest":
+        return True
+    if spec.lower() == "release":
+        return "snapshot" not in version.lower()
+    if spec.endswith("+"):
+        return version.startswith(spec[:-1])
+
+    key = version_key(version)
+    for opening, body, closing in RANGE_PART.findall(spec):
+        bounds = [bound.strip() for bound in body.split(",")]
+        if len(bounds) == 1:
+            # '[1.0]' pins an exact version
+            if bounds[0] and _compare(key, version_key(bounds[0])) == 0:
+                return True
+            continue
+        low, high = bounds[0], bounds[1]
+        if low:
+            order = _compare(key, version_key(low))
+            if order < 0 or (order == 0 and opening == "("):
+                continue
+        if high:
+            order = _compare(key, version_key(high))
+            if order > 0 or (order == 0 and closing == ")"):
+                continue
+        return True
+    return False
+
+
+def sort_versions(versions):
+    """
+    Sorts versions from oldest to newest in Maven order.
+    """
+    keys = {version: version_key(version) for version in versions}
+    return sorted(versions, key=cmp_to_key(lambda left, right: _compare(keys[left], keys[right])))
+
+
+class RegistryIndex:
+    """
+    Local index of the Maven packages published in a GitLab project.
+
+    The index is built from the GitLab packages API (paginated) and kept on
+    disk, so resolving versions, listing artifacts and spotting duplicate
+    uploads need no per-artifact API calls. Once older than its TTL it is
+    refreshed incrementally: packages are fetched newest first and paging
+    stops at the first package already known. A full rebuild (e.g. to drop
+    deleted packages) is done with refresh(full=True).
+
+    Args:
+        index_path (str): JSON file the index is stored in.
+        gitlab_url (str): Base URL of the GitLab instance.
+        project_id (int): GitLab project holding the packages.
+        token (str): Private token used for the API calls.
+        ttl (float): Seconds before the index is considered stale.
+    """
+
+    def __init__(self, index_path, gitlab_url, project_id, token, ttl=600):
+        self.index_path = os.path.abspath(index_path)
+        self.gitlab_url = gitlab_url
+        self.project_id = project_id
+        self.token = token
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as rf:
+                data = json.load(rf)
+            if data.get("projectId") == self.project_id:
+                return data
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {"projectId": self.project_id, "refreshedAt": 0, "newest": None, "packages": {}}
+
+    def _fetch_pages(self, stop_at=None):
+        """
+        Yields Maven packages of the project, newest first.
+
+        Args:
+            stop_at (str): created_at timestamp; paging stops after the first
+                page containing a package created at or before it.
+        """
+        url = f"{self.gitlab_url}/api/v4/projects/{self.project_id}/packages"
+        params = {"package_type": "maven", "order_by": "created_at", "sort": "desc",
+                  "per_page": PAGE_SIZE, "page": 1}
+        headers = {"PRIVATE-TOKEN": self.token}
+        http = session.get_session()
+
+        while True:
+            response = http.get(url, headers=headers, params=params)
+            response.raise_for_status()
+            packages = response.json()
+            yield from packages
+
+            if stop_at and any(package.get("created_at", "") <= stop_at for package in packages):
+                return
+            next_page = response.headers.get("X-Next-Page")
+            if not packages or not next_page:
+                return
+            params["page"] = int(next_page)
+
+    def refresh(self, full=False, force=False):
+        """
+        Brings the index up to date with the registry.
+
+        Args:
+            full (bool): Rebuild from scratch instead of fetching only new packages.
+            force (bool): Refresh even if the index is younger than its TTL.
+
+        Returns:
+            int: Number of package versions added.
+        """
+        with self._lock:
+            if not (full or force) and time.time() - self._data["refreshedAt"] < self.ttl:
+                return 0
+
+            incremental = not full and self._data["newest"] is not None
+            packages = self._data["packages"] if incremental else {}
+            newest = self._data["newest"] if incremental else None
+            added = 0
+
+            for package in self._fetch_pages(stop_at=newest if incremental else None):
+                versions = packages.setdefault(package["name"], {})
+                ids = versions.setdefault(package["version"], [])
+                if package["id"] not in ids:
+                    ids.append(package["id"])
+                    added += 1
+                created = package.get("created_at")
+                if created and (newest is None or created > newest):
+                    newest = created
+
+            self._data = {"projectId": self.project_id, "refreshedAt": time.time(),
+                          "newest": newest, "packages": packages}
+            write_json_atomic(self.index_path, self._data, compact=True)
+            return added
+
+    def versions(self, group_id_path, artifact_id):
+        """
+        Lists the published versions of an artifact, oldest first.
+
+        Args:
+            group_id_path (str): Group ID path formatted with '/'.
+            artifact_id (str): Name of the artifact.
+
+        Returns:
+            list: Version strings (empty if the artifact is unknown).
+        """
+        return sort_versions(self._data["packages"].get(f"{group_id_path}/{artifact_id}", {}))
+
+    def has(self, group_id_path, artifact_id, version):
+        """
+        Tells whether a version of an artifact is already published.
+        """
+        return version in self._data["packages"].get(f"{group_id_path}/{artifact_id}", {})
+
+    def resolve(self, group_id_path, artifact_id, spec):
+        """
+        Resolves a dynamic version spec to the newest matching version.
+
+        Args:
+            group_id_path (str): Group ID path formatted with '/'.
+            artifact_id (str): Name of the artifact.
+            spec (str): Version spec (see matches()).
+
+        Returns:
+            str: Newest matching version, or None if nothing matches.
+        """
+        candidates = [version for version in self.versions(group_id_path, artifact_id)
+                      if matches(version, spec)]
+        return candidates[-1] if candidates else None
+
+    def artifacts(self):
+        """
+        Returns every indexed artifact with its versions and package ids.
+
+        Returns:
+            dict: {'group/path/artifactId': {version: [package ids]}}
+        """
+        return self._data["packages"]
+
+    def collisions(self):
+        """
+        Finds versions that were published more than once.
+
+        GitLab accepts a second upload of an existing Maven version as a
+        separate package, which makes the version ambiguous.
+
+        Returns:
+            list: (package name, version, package ids) tuples.
+        """
+        return [(name, version, ids)
+                for name, versions in sorted(self._data["packages"].items())
+                for version, ids in versions.items() if len(ids) > 1]
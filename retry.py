@@ -0,0 +1,420 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import config
+import instrument
+from console import log
+
+# HTTP statuses worth retrying; anything else (401, 403, 404, ...) is permanent
+RETRYABLE_STATUSES = frozenset([408, 425, 429, 500, 502, 503, 504])
+
+
+class AdaptiveLimiter:
+    """
+    Global cap on in-flight registry transfers that adapts to rate limiting.
+
+    The limit starts at max_concurrency. It is halved when GitLab answers
+    429/503 or reports that little of its rate-limit budget is left, and
+    grows back by one after a run of successful responses. A Retry-After
+    or RateLimit-Reset hint pauses all new transfers until it expires.
+
+    Args:
+        max_concurrency (int): Upper bound for concurrent transfers.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        # (event loop, future) of coroutines waiting in acquire_async()
+        self._async_waiters = []
+
+    def acquire(self):
+        """
+        Blocks until a transfer slot is free and no pause is in effect.
+        """
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self._active >= self.limit:
+                    self._cond.wait()
+                else:
+                    self._active += 1
+                    return
+
+    async def acquire_async(self):
+        """
+        Coroutine counterpart of acquire(): waits for a slot without
+        blocking the event loop.
+
+        The coroutine sleeps until release() or a raised limit wakes it, or
+        until a pause expires, instead of polling.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._active < self.limit:
+                    self._active += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait([waiter], timeout=wait if wait > 0 else None)
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def _notify(self):
+        # Caller must hold the lock; wakes blocked threads and waiting coroutines
+        self._cond.notify_all()
+        for loop, waiter in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+        self._async_waiters.clear()
+
+    def release(self):
+        """
+        Frees a transfer slot.
+        """
+        with self._cond:
+            self._active -= 1
+            self._notify()
+
+    def throttle(self, pause=0.0):
+        """
+        Halves the concurrency limit and optionally pauses new transfers.
+
+        Args:
+            pause (float): Seconds during which no new transfer may start.
+        """
+        with self._cond:
+            new_limit = max(1, self.limit // 2)
+            if new_limit < self.limit:
+                log(f"Rate limited by registry, reducing concurrency to {new_limit}")
+            self.limit = new_limit
+            self._successes = 0
+            if pause > 0:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._notify()
+
+    def success(self):
+        """
+        Records a successful response and slowly restores concurrency.
+        """
+        with self._cond:
+            self._successes += 1
+            if self.limit < self.max_concurrency and self._successes >= self.limit * 2:
+                self.limit += 1
+                self._successes = 0
+                self._notify()
+
+
+class Backoff:
+    """
+    Retry of a failed transfer that is due after a backoff delay.
+
+    Returned by call() and call_async() with requeue instead of waiting,
+    so a worker pool can run the retry later without a worker sitting idle
+    in the meantime (see scheduler.PriorityExecutor).
+
+    Args:
+        delay (float): Seconds to wait before resume() is called.
+        resume (callable): Makes the next attempt; returns its result (an
+            awaitable for the async backend), or another Backoff.
+    """
+
+    def __init__(self, delay, resume):
+        self.delay = delay
+        self.resume = resume
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# Limiter shared by every transfer of the run, created on first use
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def configure(max_concurrency):
+    """
+    Resets the shared limiter for a run with the given worker count.
+
+    Args:
+        max_concurrency (int): Upper bound for concurrent transfers.
+    """
+    global _limiter
+    _limiter = AdaptiveLimiter(max_concurrency)
+
+
+def _shared_limiter():
+    """
+    Returns the shared limiter, sized by config.DEFAULT_JOBS unless
+    configure() was called (jarsync.transfer_pool does for every run).
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter(config.DEFAULT_JOBS)
+        return _limiter
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header (delay in seconds or HTTP date).
+
+    Args:
+        value (str): Header value.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def observe(status_code, headers):
+    """
+    Feeds the GitLab rate-limit signals of a response to the shared limiter.
+
+    Reacts to 429/503 responses, Retry-After, and the RateLimit-Remaining /
+    RateLimit-Limit / RateLimit-Reset headers GitLab sends on API calls, and
+    tells the current transfer whether its latest response is worth retrying.
+
+    Args:
+        status_code (int): HTTP status of the response.
+        headers (Mapping): Case-insensitive response headers.
+    """
+    retry_after = parse_retry_after(headers.get("Retry-After"))
+
+    transfer = instrument.current()
+    if transfer is not None:
+        transfer.retryable = status_code in RETRYABLE_STATUSES
+        transfer.retry_after = retry_after
+
+    if status_code in (429, 503):
+        _shared_limiter().throttle(pause=retry_after or 0.0)
+        return
+
+    remaining = headers.get("RateLimit-Remaining")
+    limit = headers.get("RateLimit-Limit")
+    if remaining is not None and limit:
+        try:
+            remaining, limit = int(remaining), int(limit)
+        except ValueError:
+            remaining = None
+        if remaining is not None and remaining <= max(1, limit // 10):
+            pause = 0.0
+            if remaining == 0:
+                try:
+                    pause = max(0.0, float(headers.get("RateLimit-Reset", 0)) - time.time())
+                except ValueError:
+                    pause = 0.0
+            _shared_limiter().throttle(pause=pause)
+            return
+
+    if status_code < 400:
+        _shared_limiter().success()
+
+
+def rate_limit_hook(response, *args, **kwargs):
+    """
+    requests response hook that passes every registry response to observe().
+    """
+    observe(response.status_code, response.headers)
+    return response
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Computes how long to wait before the next attempt.
+
+    Uses full-jitter exponential backoff (random delay up to
+    RETRY_BASE_DELAY * 2**attempt, capped at RETRY_MAX_DELAY), unless the
+    registry asked for a specific delay with Retry-After.
+
+    Args:
+        attempt (int): Number of attempts made so far (1 for the first retry).
+        retry_after (float): Delay requested by the registry, if any.
+
+    Returns:
+        float: Seconds to sleep.
+    """
+    if retry_after is not None:
+        return min(retry_after, config.RETRY_MAX_DELAY)
+    ceiling = min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def call(func, failed, requeue=False, attempt=0):
+    """
+    Runs a transfer under the shared limiter, retrying transient failures.
+
+    A failure is retried when the tracked transfer (see instrument.track)
+    saw a network error or a retryable HTTP status. Permanent errors such as
+    401/404 are returned immediately. The backoff delay is slept in the
+    calling thread, without holding a limiter slot. With requeue, a Backoff
+    is returned instead, so a worker pool can hand the worker to other
+    transfers until the retry is due.
+
+    Args:
+        func (callable): Performs one attempt and returns its result.
+        failed (callable): Returns True if a result represents a failure.
+        requeue (bool): Return a Backoff instead of sleeping.
+        attempt (int): Number of attempts already made.
+
+    Returns:
+        The result of the last attempt, or a Backoff.
+    """
+    while True:
+        transfer = instrument.current()
+        if transfer is not None:
+            transfer.retry_after = None
+            transfer.retryable = False
+
+        limiter = _shared_limiter()
+        limiter.acquire()
+        try:
+            result = func()
+        finally:
+            limiter.release()
+
+        if not failed(result):
+            return result
+        attempt += 1
+        delay = _should_retry(attempt, transfer)
+        if delay is None:
+            return result
+        if requeue:
+            return Backoff(delay, lambda: call(func, failed, requeue, attempt))
+        time.sleep(delay)
+
+
+def _should_retry(attempt, transfer):
+    """
+    Decides whether a failed attempt is retried and how long to wait first.
+
+    Returns:
+        float: Seconds to wait before the next attempt, or None to give up.
+    """
+    if transfer is None or not transfer.retryable or attempt > config.RETRY_MAX_ATTEMPTS:
+        return None
+    delay = backoff_delay(attempt, transfer.retry_after)
+    log(f"Retrying {transfer.jar_filename} in {delay:.1f}s "
+          f"(attempt {attempt + 1} of {config.RETRY_MAX_ATTEMPTS + 1})")
+    instrument.note_retry()
+    return delay
+
+
+async def call_async(func, failed, requeue=False, attempt=0):
+    """
+    Coroutine counterpart of call() for the asyncio backend.
+
+    Waits for a limiter slot and for the backoff delay without blocking the
+    event loop.
+
+    Args:
+        func (callable): Returns an awaitable performing one attempt.
+        failed (callable): Returns True if a result represents a failure.
+        requeue (bool): Return a Backoff instead of sleeping.
+        attempt (int): Number of attempts already made.
+
+    Returns:
+        The result of the last attempt, or a Backoff.
+    """
+    while True:
+        transfer = instrument.current()
+        if transfer is not None:
+            transfer.retry_after = None
+            transfer.retryable = False
+
+        limiter = _shared_limiter()
+        await limiter.acquire_async()
+        try:
+            result = await func()
+        finally:
+            limiter.release()
+
+        if not failed(result):
+            return result
+        attempt += 1
+        delay = _should_retry(attempt, transfer)
+        if delay is None:
+            return result
+        if requeue:
+            return Backoff(delay, lambda: call_async(func, failed, requeue, attempt))
+        await asyncio.sleep(delay)
+
+
+def tracked(operation, jar_filename, func, failed, outcome, requeue=False):
+    """
+    Runs call() for one JAR while tracking it as a transfer (see
+    instrument.track). A returned Backoff resumes tracking the same
+    transfer when the retry runs.
+
+    Args:
+        operation (str): 'upload' or 'download'.
+        jar_filename (str): File name of the JAR.
+        func (callable): Performs one attempt and returns its result.
+        failed (callable): Returns True if a result represents a failure.
+        outcome (callable): Maps the final result to the (status, size)
+            recorded for the transfer.
+        requeue (bool): Return a Backoff instead of sleeping.
+
+    Returns:
+        The result of the last attempt, or a Backoff.
+    """
+    transfer = instrument.Transfer(operation, jar_filename)
+    return _tracked(transfer, lambda: call(func, failed, requeue), outcome)
+
+
+def _tracked(transfer, attempt, outcome):
+    with instrument.resume(transfer):
+        result = attempt()
+        if isinstance(result, Backoff):
+            transfer.deferred = True
+            resume = result.resume
+            return Backoff(result.delay, lambda: _tracked(transfer, resume, outcome))
+        transfer.finish(*outcome(result))
+        return result
+
+
+async def tracked_async(operation, jar_filename, func, failed, outcome, requeue=False):
+    """
+    Coroutine counterpart of tracked() for the asyncio backend.
+    """
+    transfer = instrument.Transfer(operation, jar_filename)
+    return await _tracked_async(transfer, lambda: call_async(func, failed, requeue), outcome)
+
+
+async def _tracked_async(transfer, attempt, outcome):
+    with instrument.resume(transfer):
+        result = await attempt()
+        if isinstance(result, Backoff):
+            transfer.deferred = True
+            resume = result.resume
+            return Backoff(result.delay, lambda: _tracked_async(transfer, resume, outcome))
+        transfer.finish(*outcome(result))
+        return result
@@ -0,0 +1,120 @@
+import os
+from fnmatch import fnmatch
+from console import log
+
+
+def _matches(name, rel_path, patterns):
+    """
+    Checks a directory entry against a list of glob patterns.
+
+    Patterns are matched against both the entry name and its path relative
+    to the scan root (with '/' separators).
+    """
+    return any(fnmatch(name, pattern) or fnmatch(rel_path, pattern) for pattern in patterns)
+
+
+def walk_dirs(root, exclude=None, max_depth=None):
+    """
+    Recursively walks a directory tree with os.scandir.
+
+    Directory entry types come from the cached dirent data, so no extra stat
+    call is made per entry. Directories are yielded top-down, each one
+    before its subdirectories are visited, which lets callers start work on
+    a directory while the rest of the tree is still being scanned.
+
+    Args:
+        root (str): Directory to start from.
+        exclude (list): Glob patterns; matching directories are pruned and
+            matching files are left out.
+        max_depth (int): Maximum depth below root to descend (None = unlimited,
+            0 = root only).
+
+    Yields:
+        tuple: (dir_path, rel_dir, files) where rel_dir is dir_path relative to
+        root ('' for root itself) and files is a list of (full_path, file_name)
+        for the regular files directly inside dir_path.
+    """
+    exclude = exclude or []
+    stack = [(root, "", 0)]
+
+    while stack:
+        dir_path, rel_dir, depth = stack.pop()
+        files = []
+        subdirs = []
+
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if exclude and _matches(entry.name, rel_path, exclude):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.path, rel_path))
+                    elif entry.is_file():
+                        files.append((entry.path, entry.name))
+        except OSError as e:
+            log(f"Cannot scan directory {dir_path}: {e}")
+            continue
+
+        yield (dir_path, rel_dir, files)
+
+        if max_depth is None or depth < max_depth:
+            # Reverse so directories are visited in sorted order
+            stack.extend((path, rel_path, depth + 1)
+                         for path, rel_path in sorted(subdirs, reverse=True))
+
+
+def iter_jar_dirs(root, include=None, exclude=None, max_depth=None):
+    """
+    Streams the directories of a tree that contain JAR files.
+
+    Args:
+        root (str): Directory to start from.
+        include (list): Glob patterns JAR files must match (default: all JARs).
+        exclude (list): Glob patterns for directories and files to skip.
+        max_depth (int): Maximum depth below root to descend (None = unlimited).
+
+    Yields:
+        tuple: (dir_path, jars) where jars is a list of (full_path, file_name).
+    """
+    for dir_path, rel_dir, files in walk_dirs(root, exclude=exclude, max_depth=max_depth):
+        jars = [(full_path, file_name) for full_path, file_name in files
+                if file_name.endswith(".jar") and (
+                    not include or _matches(file_name,
+                                            f"{rel_dir}/{file_name}" if rel_dir else file_name,
+                                            include))]
+        if jars:
+            yield (dir_path, jars)
+
+
+def iter_manifest_dirs(root, manifest_name, exclude=None, max_depth=None):
+    """
+    Streams the directories of a tree that contain a manifest file.
+
+    Args:
+        root (str): Directory to start from.
+        manifest_name (str): Manifest file name (e.g. 'library.json').
+        exclude (list): Glob patterns for directories to skip.
+        max_depth (int): Maximum depth below root to descend (None = unlimited).
+
+    Yields:
+        str: Path of every directory containing the manifest.
+    """
+    for dir_path, _, files in walk_dirs(root, exclude=exclude, max_depth=max_depth):
+        if any(file_name == manifest_name for _, file_name in files):
+            yield dir_path
+
+
+def list_jar_files(lib_dir):
+    """
+    Lists the .jar files directly inside a directory (non-recursive).
+
+    Args:
+        lib_dir (str): Directory to scan.
+
+    Returns:
+        list: (full_path, file_name) tuples for every JAR found.
+    """
+    for _, jars in iter_jar_dirs(lib_dir, max_depth=0):
+        return jars
+    return []
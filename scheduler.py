@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import Future
+from fnmatch import fnmatch
+import retry
+
+# Priority classes, most urgent first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = PRIORITIES["normal"]
+
+# (glob, priority) rules of the run, first match wins
+_rules = []
+
+
+def parse_priority_rule(text):
+    """
+    Parses a 'GLOB=CLASS' priority rule (e.g. 'services/*=high').
+
+    Returns:
+        tuple: (glob, priority) where priority is a PRIORITIES value.
+
+    Raises:
+        ValueError: If the rule has no '=' or names an unknown class.
+    """
+    pattern, _, name = text.rpartition("=")
+    if not pattern or name.strip().lower() not in PRIORITIES:
+        raise ValueError(f"Invalid priority rule: {text} (expected GLOB={'|'.join(PRIORITIES)})")
+    return (pattern.strip(), PRIORITIES[name.strip().lower()])
+
+
+def configure(rules):
+    """
+    Sets the priority rules of the run.
+
+    Args:
+        rules (list): (glob, priority) tuples from parse_priority_rule().
+    """
+    global _rules
+    _rules = list(rules or [])
+
+
+def priority_of(lib_dir, file_name, entry=None):
+    """
+    Returns the priority class of a JAR transfer.
+
+    A 'priority' field in the JAR's manifest entry wins. Otherwise the first
+    rule whose glob matches the JAR name, the directory name, the directory
+    path or the JAR path decides; JARs matching no rule are 'normal'.
+
+    Args:
+        lib_dir (str): Directory of the JAR.
+        file_name (str): File name of the JAR.
+        entry (dict): Optional library.json entry of the JAR.
+
+    Returns:
+        int: PRIORITIES value (lower runs first).
+    """
+    if entry and str(entry.get("priority", "")).lower() in PRIORITIES:
+        return PRIORITIES[entry["priority"].lower()]
+
+    candidates = (file_name, os.path.basename(lib_dir), lib_dir, os.path.join(lib_dir, file_name))
+    for pattern, priority in _rules:
+        if any(fnmatch(candidate, pattern) for candidate in candidates):
+            return priority
+    return DEFAULT_PRIORITY
+
+
+class PriorityExecutor:
+    """
+    Hands work to an executor in priority order.
+
+    Only max_running calls are passed on to the wrapped executor at a time.
+    The rest wait in a heap ordered by (priority, submission order), so a
+    high priority JAR submitted late in a long scan still starts before
+    queued normal and low priority ones. Works with ThreadPoolExecutor and
+    async_backend.AsyncExecutor alike, since both return
+    concurrent.futures.Future objects.
+
+    A call that returns a retry.Backoff frees its worker and goes back in
+    the queue, in its original place, once the backoff delay has passed.
+    The caller's future only resolves with the final result.
+
+    Args:
+        executor: Executor with submit() and shutdown().
+        max_running (int): Number of calls the wrapped executor runs at once.
+    """
+
+    def __init__(self, executor, max_running):
+        self._executor = executor
+        self.max_running = max(1, max_running)
+        self._queue = []
+        self._running = 0
+        self._waiting = 0
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def submit(self, func, *args, priority=DEFAULT_PRIORITY):
+        """
+        Queues func(*args) with a priority class.
+
+        Returns:
+            concurrent.futures.Future: Future for the call's result.
+        """
+        future = Future()
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._order), func, args, future))
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                if self._running >= self.max_running or not self._queue:
+                    return
+                priority, order, func, args, future = heapq.heappop(self._queue)
+                self._running += 1
+            inner = self._executor.submit(func, *args)
+            inner.add_done_callback(lambda done, item=(priority, order, future): self._finished(done, *item))
+
+    def _finished(self, done, priority, order, future):
+        backoff = done.result() if done.exception() is None else None
+        if not isinstance(backoff, retry.Backoff):
+            backoff = None
+        with self._cond:
+            self._running -= 1
+            if backoff is not None:
+                self._waiting += 1
+            self._cond.notify_all()
+        if backoff is not None:
+            timer = threading.Timer(backoff.delay, self._requeue, (backoff, priority, order, future))
+            timer.daemon = True
+            timer.start()
+        # Start the next call before the caller handles this result
+        self._dispatch()
+        if backoff is not None:
+            return
+        if done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+
+    def _requeue(self, backoff, priority, order, future):
+        with self._cond:
+            self._waiting -= 1
+            heapq.heappush(self._queue, (priority, order, backoff.resume, (), future))
+        self._dispatch()
+
+    def shutdown(self):
+        """
+        Waits until every queued call (and pending retry) has run, then
+        shuts the executor down.
+        """
+        with self._cond:
+            while self._queue or self._running or self._waiting:
+                self._cond.wait()
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
@@ -0,0 +1,203 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+import config
+import instrument
+import retry
+from console import log
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """
+    HTTPConnection that reports how long opening the socket took.
+    """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        self._connect_seconds = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        self._connect_seconds = 0.0
+        start = time.perf_counter()
+        super().connect()
+        total = time.perf_counter() - start
+        # Anything beyond the socket connect is the TLS handshake
+        instrument.note_connect(self._connect_seconds, max(total - self._connect_seconds, 0.0))
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """
+    HTTPSConnection that reports socket connect and TLS handshake times.
+    """
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TransferAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections send request bodies in
+    config.TRANSFER_CHUNK_SIZE blocks instead of the 16 KB default, and
+    report connect/TLS timings to the instrument module.
+    """
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault("blocksize", config.TRANSFER_CHUNK_SIZE)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
+
+
+# Shared session used by every registry call
+_session = None
+_session_lock = threading.RLock()
+
+
+def build_session(pool_size=None, max_retries=None, keep_alive=None):
+    """
+    Builds an HTTP session for GitLab registry calls.
+
+    The session keeps a pool of persistent connections to the registry host,
+    so each JAR reuses an open TCP/TLS connection instead of paying a fresh
+    handshake. Connection errors are retried by the adapter; HTTP error
+    statuses (429/5xx) are left to the retry scheduler in retry.py, whose
+    response hook also watches the GitLab rate-limit headers.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+            (default: config.HTTP_POOL_SIZE).
+        max_retries (int): Adapter-level retries (default: config.HTTP_MAX_RETRIES).
+        keep_alive (bool): Reuse connections between requests
+            (default: config.HTTP_KEEP_ALIVE).
+
+    Returns:
+        requests.Session: The new session (not installed as the shared one,
+        see init_session and use_session).
+    """
+    pool_size = pool_size or config.HTTP_POOL_SIZE
+    max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+    keep_alive = config.HTTP_KEEP_ALIVE if keep_alive is None else keep_alive
+
+    connect_retries = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=0,
+        backoff_factor=0.5,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False
+    )
+    adapter = TransferAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=connect_retries
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    session.hooks["response"].append(retry.rate_limit_hook)
+    return session
+
+
+def init_session(pool_size=None, max_retries=None, keep_alive=None):
+    """
+    Builds the shared HTTP session used for all GitLab registry calls and
+    closes the one it replaces.
+
+    Takes the same arguments as build_session().
+
+    Returns:
+        requests.Session: The newly created shared session.
+    """
+    session = build_session(pool_size=pool_size, max_retries=max_retries, keep_alive=keep_alive)
+    old_session = use_session(session)
+    if old_session is not None:
+        old_session.close()
+    return session
+
+
+def use_session(session):
+    """
+    Installs a session as the shared one without closing the previous one,
+    e.g. the warm session of a jarsync.JarSyncClient.
+
+    Args:
+        session (requests.Session): Session to share, or None to reset.
+
+    Returns:
+        requests.Session: The previously shared session (may be None).
+    """
+    global _session
+    with _session_lock:
+        old_session, _session = _session, session
+    return old_session
+
+
+def get_session():
+    """
+    Returns the shared HTTP session, creating it on first use.
+
+    Returns:
+        requests.Session: Session shared by all upload and download paths.
+    """
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                init_session()
+    return _session
+
+
+def connection_stats(session=None):
+    """
+    Counts the connections opened and reused by a session.
+
+    Args:
+        session (requests.Session): Session to inspect (default: the shared one).
+
+    Returns:
+        tuple: (opened, reused) where:
+            - opened (int): New TCP/TLS connections established.
+            - reused (int): Requests served over an already open connection.
+    """
+    opened = 0
+    requests_made = 0
+    session = session or _session
+    if session is None:
+        return (0, 0)
+
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_made += pool.num_requests
+
+    return (opened, max(requests_made - opened, 0))
+
+
+def print_connection_stats(session=None):
+    """
+    Prints how many connections were opened vs. reused during the run.
+
+    Args:
+        session (requests.Session): Session to inspect (default: the shared one).
+    """
+    opened, reused = connection_stats(session)
+    log(f"Connections opened: {opened}, reused: {reused}")